@@ -8,9 +8,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import threading
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms.settings')
+os.environ.setdefault('LMS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+from lms_app.autocomplete import warm_course_index  # noqa: E402
+
+# خوادم ASGI تستورد التطبيق داخل حلقة الأحداث حيث يُمنع ORM المتزامن
+threading.Thread(target=warm_course_index, daemon=True).start()
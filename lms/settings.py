@@ -19,13 +19,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# البيئة: 'development' (الافتراضي) أو 'production'. الإنتاج يسقط أدوات التطوير
+# (debug_toolbar وتطبيقه ووسيطه) فلا يدفع كل أمر وعامل وطلب ثمن تحميلها.
+LMS_ENV = os.environ.get('LMS_ENV', 'development')
+PRODUCTION = LMS_ENV == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-y#%w+8i^jve*czuwiyoic2q=05m#8(_g49ydd)q=a)umlivz96'
+SECRET_KEY = os.environ.get(
+    'LMS_SECRET_KEY', 'django-insecure-y#%w+8i^jve*czuwiyoic2q=05m#8(_g49ydd)q=a)umlivz96'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('LMS_DEBUG', '0' if PRODUCTION else '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('LMS_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -42,11 +49,13 @@ INSTALLED_APPS = [
     'tinymce',
     'smart_selects',
     'taggit',
-    'debug_toolbar',
-    
 ]
 INSTALLED_APPS +=['guardian']
 
+# أدوات التطوير فقط
+DEV_APPS = [] if PRODUCTION else ['debug_toolbar']
+INSTALLED_APPS += DEV_APPS
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',          # العادي
     'guardian.backends.ObjectPermissionBackend',          # من django-guardian
@@ -59,6 +68,7 @@ ANONYMOUS_USER_ID = -1
 
 
 MIDDLEWARE = [
+    'lms_app.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -67,11 +77,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
-
-
-    
 ]
+if 'debug_toolbar' in DEV_APPS:
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -112,6 +120,37 @@ USE_I18N = True
 USE_L10N = True
 USE_TZ = True
 
+# الكاش: file افتراضياً لأن إصدار الكتالوج وكاش الردود والعدادات يجب أن تشترك فيها
+# عمليات الويب وCelery وأوامر الإدارة، وإلا لا يُبطل تعديلُ عمليةٍ كاشَ غيرها.
+# locmem لعملية واحدة فقط (تطوير)، redis للمشاركة بين الخوادم.
+# قاعدة Redis منفصلة عن وسيط Celery حتى لا يمسح أحدهما بيانات الآخر.
+LMS_CACHE_BACKEND = os.environ.get('LMS_CACHE_BACKEND', 'file')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lms',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('LMS_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('LMS_CACHE_URL', 'redis://localhost:6379/1'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[LMS_CACHE_BACKEND],
+}
+
+# عروض القراءة غير المتزامنة، يفعّلها lms/asgi.py افتراضياً
+LMS_ASYNC_VIEWS = os.environ.get('LMS_ASYNC_VIEWS', '0') == '1'
+
+# توزيع أحداث الكتب: 'commit' بعد كل معاملة، أو 'background' عبر drain_book_events
+LMS_EVENTS_FLUSH = os.environ.get('LMS_EVENTS_FLUSH', 'commit')
+
 CELERY_BROKER_URL = 'redis://localhost:6379/0' 
 
 STATIC_URL = '/static/'
@@ -122,13 +161,45 @@ WSGI_APPLICATION = 'lms.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# WAL يسمح للقراء بالعمل أثناء الكتابة (عمال Celery والطلبات)، وsynchronous=NORMAL
+# آمن مع WAL ويوفر fsync عند كل commit. القيم السالبة في cache_size بالكيلوبايت.
+SQLITE_DATABASE = os.environ.get('LMS_DB_PATH', BASE_DIR / 'db.sqlite3')
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    f"PRAGMA mmap_size={int(os.environ.get('LMS_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    f"PRAGMA cache_size={-int(os.environ.get('LMS_SQLITE_CACHE_KB', 64 * 1024))}",
+]
+SQLITE_OPTIONS = {
+    'init_command': ';'.join(SQLITE_PRAGMAS),
+    # الكاتب يحجز القفل من بداية المعاملة، فينتظر timeout بدل فشل الترقية من قراءة إلى كتابة
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': SQLITE_DATABASE,
+        'OPTIONS': SQLITE_OPTIONS,
+        'CONN_MAX_AGE': int(os.environ.get('LMS_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# نسخة قراءة فقط (litestream أو نسخة دورية، أو الملف نفسه باتصالات منفصلة)،
+# تستخدمها العروض المعلّمة بـ lms_app.routers.read_replica
+LMS_DB_REPLICA_PATH = os.environ.get('LMS_DB_REPLICA_PATH')
+if LMS_DB_REPLICA_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': f'file:{LMS_DB_REPLICA_PATH}?mode=ro',
+        # journal_mode لا يتغير عبر اتصال قراءة فقط، وبقية الإعدادات لكل اتصال
+        'OPTIONS': {**SQLITE_OPTIONS, 'init_command': ';'.join(SQLITE_PRAGMAS[1:]), 'transaction_mode': None},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['lms_app.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -2,12 +2,12 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
-import debug_toolbar
 from django.conf.urls.i18n import i18n_patterns
+from lms_app.profiling import metrics_view
 
 urlpatterns = [
     path('i18n/', include('django.conf.urls.i18n')),
-    path('__debug__/', include(debug_toolbar.urls)),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += i18n_patterns(
@@ -17,5 +17,9 @@ urlpatterns += i18n_patterns(
     path("chaining/", include("smart_selects.urls")),
 )
 
+# شريط التصحيح موجود في بيئة التطوير فقط (DEV_APPS في الإعدادات)
+if 'debug_toolbar' in settings.INSTALLED_APPS:
+    urlpatterns.insert(1, path('__debug__/', include('debug_toolbar.urls')))
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
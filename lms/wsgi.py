@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms.settings')
 
 application = get_wsgi_application()
+
+from lms_app.autocomplete import warm_course_index  # noqa: E402
+
+warm_course_index()
@@ -1,3 +1,12 @@
-from .celery import app as celery_app
+# تطبيق Celery لا يُستورد مع الحزمة: الأوامر والويب لا تحتاجه إلا عند إرسال مهمة
+# (lms_app.tasks تستورده)، والعامل يجده عبر celery -A lms_app في lms_app.celery.
 
-__all__ = ('celery_app',)
\ No newline at end of file
+
+def __getattr__(name):
+    if name == 'celery_app':
+        from .celery import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ('celery_app',)
@@ -1,30 +1,59 @@
+from decimal import Decimal, InvalidOperation
 from django.contrib import admin, messages
 from django import forms
 from django.forms import TextInput
 from django.db import models
-from tinymce.widgets import TinyMCE
 from .models import Book, Category, Course
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
-from django.core import serializers
-from django.http import HttpResponse
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from .tasks import generate_books_pdf_task
-from django.urls import path
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
 from django.template.response import TemplateResponse
-from django.db.models import Avg
-from guardian.shortcuts import assign_perm, get_perms, get_objects_for_user
+from .stats import get_book_stats
+from . import bulk, events, exports, search, tags
+from .permissions import get_object_perms, in_group, invalidate_user_perms, prefetch_object_perms
+
+EXPORT_ASYNC_THRESHOLD = getattr(settings, 'LMS_EXPORT_ASYNC_THRESHOLD', 50000)
+
+
+def _export(modeladmin, request, queryset, fmt):
+    # التصديرات الكبيرة تُكتب إلى ملف في الخلفية بدل إبقاء الطلب مفتوحاً
+    if queryset.count() > EXPORT_ASYNC_THRESHOLD:
+        from .tasks import export_books_task
+        filename = exports.new_export_filename(request.user.pk, fmt)
+        export_books_task.delay(exports.id_ranges(queryset), fmt, filename)
+        modeladmin.message_user(
+            request,
+            format_html(
+                _("التصدير كبير، سيكون الملف جاهزاً خلال دقائق في <a href=\"{url}\">{name}</a>"),
+                url=reverse('admin:lms_app_book_export', args=[filename]), name=filename,
+            ),
+            messages.INFO,
+        )
+        return None
+    messages.success(request, _("تم تصدير البيانات بنجاح."))
+    return exports.streaming_export(queryset, fmt)
 
 
+@admin.action(description=_("تصدير JSON"))
 def export_as_json(modeladmin, request, queryset):
-    response = HttpResponse(content_type="application/json")
-    response['Content-Disposition'] = 'attachment; filename=export.json'
-    serializers.serialize("json", queryset, stream=response)
-    messages.success(request, _("تم تصدير البيانات بنجاح."))
-    return response
+    return _export(modeladmin, request, queryset, 'json')
+
+
+@admin.action(description=_("تصدير NDJSON"))
+def export_as_ndjson(modeladmin, request, queryset):
+    return _export(modeladmin, request, queryset, 'ndjson')
+
+
+@admin.action(description=_("تصدير CSV"))
+def export_as_csv(modeladmin, request, queryset):
+    return _export(modeladmin, request, queryset, 'csv')
 
 @admin.action(description=_("توليد ملفات PDF"))
 def generate_pdf_books_background(modeladmin, request, queryset):
+    from .tasks import generate_books_pdf_task
     book_ids = list(queryset.values_list('id', flat=True))
     generate_books_pdf_task.delay(book_ids)
     modeladmin.message_user(request, _("تم إرسال المهمة إلى الخلفية بنجاح عبر Celery."), messages.SUCCESS)
@@ -58,11 +87,17 @@ class BookForm(forms.ModelForm):
 
 
 class CourseForm(forms.ModelForm):
-    description = forms.CharField(widget=TinyMCE(attrs={'cols': 80, 'rows': 30}))
+    description = forms.CharField(widget=forms.Textarea)
     class Meta:
         model = Course
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # المحرر يُحمَّل عند فتح النموذج فقط، لا عند تحميل admin في كل أمر وعامل
+        from tinymce.widgets import TinyMCE
+        self.fields['description'].widget = TinyMCE(attrs={'cols': 80, 'rows': 30})
+
 
 class BookInline(admin.StackedInline):
     model = Book
@@ -74,20 +109,54 @@ class BookInline(admin.StackedInline):
 
 
 class PriceRangeFilter(admin.SimpleListFilter):
+    """فئات السعر من توزيع الأسعار الفعلي (analytics.price_buckets) بدل حد ثابت."""
     title = _('السعر')
     parameter_name = 'price_range'
 
     def lookups(self, request, model_admin):
-        return [
-            ('above_150', _('أعلى من 150')),
-            ('below_150', _('أقل من 150')),
-        ]
+        # NumPy يُحمَّل مع أول عرض للقائمة، لا مع تحميل admin في كل أمر
+        from . import analytics
+        choices = []
+        for bucket in analytics.get_report()['price_buckets']:
+            low, high = bucket['low'], bucket['high']
+            if low is None:
+                label = _('أقل من %(high)s') % {'high': f'{high:g}'}
+            elif high is None:
+                label = _('%(low)s فأكثر') % {'low': f'{low:g}'}
+            else:
+                label = f'{low:g} – {high:g}'
+            value = f"{'' if low is None else f'{low:g}'}-{'' if high is None else f'{high:g}'}"
+            choices.append((value, f"{label} ({bucket['count']})"))
+        return choices
 
     def queryset(self, request, queryset):
-        if self.value() == 'above_150':
-            return queryset.filter(price__isnull=False, price__gt=150)
-        if self.value() == 'below_150':
-            return queryset.filter(price__isnull=False, price__lt=150)
+        if not self.value():
+            return queryset
+        low, _sep, high = self.value().partition('-')
+        try:
+            low, high = (Decimal(bound) if bound else None for bound in (low, high))
+        except InvalidOperation:
+            return queryset
+        queryset = queryset.filter(price__isnull=False)
+        if low is not None:
+            queryset = queryset.filter(price__gte=low)
+        if high is not None:
+            queryset = queryset.filter(price__lt=high)
+        return queryset
+
+
+class TagFilter(admin.SimpleListFilter):
+    title = _('الوسم')
+    parameter_name = 'tag'
+    # أكثر الوسوم استخداماً فقط، حتى لا تطول القائمة
+    limit = 20
+
+    def lookups(self, request, model_admin):
+        return [(name, f"{name} ({count})") for name, count in tags.cloud(limit=self.limit)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return tags.with_any(queryset, [self.value()])
         return queryset
 
 
@@ -119,11 +188,17 @@ class CourseAdmin(admin.ModelAdmin):
             return True
         if obj is None:
             return True
-        return 'change_book' in get_perms(request.user, obj)
+        return 'change_book' in get_object_perms(request, obj)
 
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
 
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        if not request.user.is_superuser:
+            prefetch_object_perms(request, changelist.result_list)
+        return changelist
+
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         messages.success(request, _("تم حفظ الدورة: %(name)s") % {'name': obj.name})
@@ -135,10 +210,10 @@ class BookAdmin(admin.ModelAdmin):
     date_hierarchy = 'published_date'
     list_display = ['title', 'author', 'category', 'status', 'course', 'is_active_display', 'status_color']
     list_display_links = ['title', 'author']
-    list_filter = ['category', 'status', 'course', 'active', PriceRangeFilter]
+    list_filter = ['category', 'status', 'course', 'active', PriceRangeFilter, TagFilter]
     search_fields = ['title', 'author', 'course__name']
     autocomplete_fields = ['course', 'category']
-    actions = [export_as_json, generate_pdf_books_background, 'activate_books', 'deactivate_books']
+    actions = [export_as_json, export_as_ndjson, export_as_csv, generate_pdf_books_background, 'activate_books', 'deactivate_books']
     ordering = ['-active', 'category', '-id']
     readonly_fields = ['category']
     save_as = True
@@ -179,61 +254,105 @@ class BookAdmin(admin.ModelAdmin):
             obj.owner = request.user
         super().save_model(request, obj, form, change)
         if not change:
+            from guardian.shortcuts import assign_perm
             assign_perm('change_book', request.user, obj)
             assign_perm('view_book', request.user, obj)
+            invalidate_user_perms(request, request.user)
         if change:
             messages.info(request, _("تم تحديث الكتاب: %(title)s") % {'title': obj.title})
         else:
             messages.success(request, _("تمت إضافة الكتاب: %(title)s") % {'title': obj.title})
 
     def has_add_permission(self, request, obj=None):
-        return request.user.is_superuser or request.user.groups.filter(name='Book Editors').exists()
+        return request.user.is_superuser or in_group(request, 'Book Editors')
 
     def has_change_permission(self, request, obj=None):
         if request.user.is_superuser:
             return True
         if obj is None:
             return True
-        return 'change_book' in get_perms(request.user, obj)
+        return 'change_book' in get_object_perms(request, obj)
 
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
 
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and search.is_available():
+            return search.filter_books(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        if not request.user.is_superuser:
+            prefetch_object_perms(request, changelist.result_list)
+        return changelist
+
+    def delete_queryset(self, request, queryset):
+        events.delete_books(queryset)
+
     def get_queryset(self, request):
         qs = super().get_queryset(request).prefetch_related('tags')
         if request.user.is_superuser:
             return qs
+        from guardian.shortcuts import get_objects_for_user
         return get_objects_for_user(request.user, 'lms_app', klass=Book)  # استبدل 'yourapp'
 
     @admin.action(description=_("تفعيل الكتب"))
     def activate_books(self, request, queryset):
-        updated = queryset.update(active=True)
+        updated = bulk.update(queryset, {'active': True}).processed
         messages.success(request, _("تم تفعيل %(count)d كتاب بنجاح.") % {'count': updated})
 
     @admin.action(description=_("إلغاء تفعيل الكتب"))
     def deactivate_books(self, request, queryset):
-        updated = queryset.update(active=False)
+        updated = bulk.update(queryset, {'active': False}).processed
         messages.warning(request, _("%(count)d كتاب تم إلغاء تفعيله.") % {'count': updated})
 
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path('report/', self.admin_site.admin_view(self.report_view), name='book-report'),
+            path('exports/<str:filename>', self.admin_site.admin_view(self.export_view), name='lms_app_book_export'),
         ]
         return custom_urls + urls
 
+    def export_view(self, request, filename):
+        # الاسم يُتحقق منه بالنمط قبل بناء المسار، فلا يخرج عن EXPORT_ROOT
+        owner = exports.export_owner(filename)
+        if owner is None or not (request.user.is_superuser or owner == request.user.pk):
+            raise Http404
+        try:
+            return FileResponse(open(exports.export_path(filename), 'rb'), as_attachment=True, filename=filename)
+        except FileNotFoundError:
+            raise Http404(_("ملف التصدير غير جاهز بعد أو انتهت صلاحيته."))
+
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
         extra_context['report_url'] = 'report/'
         return super().changelist_view(request, extra_context=extra_context)
 
     def report_view(self, request):
+        from . import analytics
+        stats = get_book_stats()
+        report = analytics.get_report()
         context = dict(
             self.admin_site.each_context(request),
             title=_("تقرير الكتب"),
-            total_books=Book.objects.count(),
-            avg_price=Book.objects.aggregate(Avg('price'))['price__avg'],
-            active_count=Book.objects.filter(active=True).count(),
+            total_books=stats['total_books'],
+            avg_price=stats['avg_price'],
+            active_count=stats['active_count'],
+            report=report,
+            percentiles=analytics.PERCENTILES,
+            distributions=[
+                (_("السعر"), report['price']),
+                (_("سعر التأجير اليومي"), report['retal_price_day']),
+                (_("فترة التأجير"), report['retal_period']),
+                (_("إجمالي التأجير"), report['total_retal']),
+            ],
+            breakdowns=[
+                (_("التصنيف"), report['by_category']),
+                (_("الدورة"), report['by_course']),
+                (_("الحالة"), report['by_status']),
+            ],
         )
         return TemplateResponse(request, "admin/book_report.html", context)
 
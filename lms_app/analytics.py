@@ -0,0 +1,243 @@
+"""
+تحليلات الأسعار والتأجير لتقرير الإدارة وفلتر السعر.
+
+الأعمدة تُقرأ مرة واحدة بـ values_list إلى مصفوفات NumPy، وكل المدرجات والمئينات
+والمجاميع حسب التصنيف والدورة والحالة تُحسب عليها دفعة واحدة بدل استعلام لكل
+مجموعة. النتيجة مخزنة بإصدار الكتالوج، فأي تعديل على الكتب يجعلها قديمة.
+"""
+import math
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from .caching import catalogue
+from .models import Book, Category, Course
+
+REPORT_CACHE_TIMEOUT = getattr(settings, 'LMS_REPORT_CACHE_TIMEOUT', 60 * 10)
+HISTOGRAM_BINS = getattr(settings, 'LMS_REPORT_HISTOGRAM_BINS', 12)
+PRICE_BUCKETS = getattr(settings, 'LMS_PRICE_BUCKETS', 5)
+PROJECTION_DAYS = getattr(settings, 'LMS_REPORT_PROJECTION_DAYS', 30)
+PERCENTILES = (10, 25, 50, 75, 90)
+# المعرف الفارغ (كتاب بلا تصنيف أو دورة) في المصفوفات الصحيحة
+MISSING = -1
+
+
+def _ids(values):
+    # None يصبح nan في مصفوفة float، ثم نستبدله بـ MISSING
+    return np.nan_to_num(np.array(values, dtype=float), nan=MISSING).astype(np.int64)
+
+
+def columns(queryset=None):
+    """أعمدة الكتب كمصفوفات: المفاتيح صحيحة أو نصية، والمبالغ float مع nan للفارغ."""
+    queryset = Book.objects.all() if queryset is None else queryset
+    # التحويل إلى REAL في SQL يتجنب إنشاء Decimal لكل خلية
+    selected = queryset.order_by().values_list(
+        'category_id', 'course_id', 'status', 'active',
+        Cast('price', FloatField()), Cast('retal_price_day', FloatField()),
+        'retal_period', Cast('total_retal', FloatField()),
+    )
+    # نُنفّذ SQL الـ values_list مباشرة: القيم الخام تكفي NumPy، ومحوّلات الحقول
+    # لكل خلية كانت نصف زمن القراءة
+    try:
+        sql, params = selected.query.get_compiler(selected.db).as_sql()
+    except EmptyResultSet:
+        rows = []
+    else:
+        with connections[selected.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    category, course, status, active, price, day, period, total = zip(*rows) if rows else ([],) * 8
+    return {
+        'category': _ids(category),
+        'course': _ids(course),
+        'status': np.array([value or '' for value in status], dtype=str),
+        'active': np.array(active, dtype=bool),
+        'price': np.array(price, dtype=float),
+        'retal_price_day': np.array(day, dtype=float),
+        'retal_period': np.array(period, dtype=float),
+        'total_retal': np.array(total, dtype=float),
+    }
+
+
+def _present(values):
+    return values[~np.isnan(values)]
+
+
+def _round(value):
+    return None if value is None or math.isnan(value) else round(float(value), 2)
+
+
+def percentiles(values):
+    values = _present(values)
+    if not values.size:
+        return {q: None for q in PERCENTILES}
+    return {q: _round(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def _nice_step(raw):
+    """أصغر خطوة من 1 أو 2 أو 2.5 أو 5 مضروبة في قوة للعشرة لا تقل عن raw."""
+    magnitude = 10 ** math.floor(math.log10(raw))
+    return next(m * magnitude for m in (1, 2, 2.5, 5, 10) if raw <= m * magnitude)
+
+
+def _round_nice(value):
+    """تقريب حد فئة إلى رقمين معنويين بخطوات 5 (137 -> 135، 12.3 -> 12.5)."""
+    if value <= 0:
+        return 0.0
+    step = 5 * 10 ** (math.floor(math.log10(value)) - 1)
+    return round(math.floor(value / step + 0.5) * step, 2)
+
+
+def histogram(values, bins=HISTOGRAM_BINS):
+    """
+    مدرج بحدود مستديرة بنحو bins خانة حتى المئين 99، والقيم الشاذة فوقه في
+    خانة أخيرة مفتوحة (high = None) حتى لا تضغط بقية التوزيع في خانة واحدة.
+    """
+    values = _present(values)
+    if not values.size:
+        return []
+    low, top = float(values.min()), float(values.max())
+    high = min(float(np.percentile(values, 99)), top)
+    step = _nice_step((high - low) / bins if high > low else 1)
+    if np.all(values == np.floor(values)):
+        # القيم الصحيحة (فترة التأجير بالأيام) لا تُقسم على خانات كسرية
+        step = max(1, math.ceil(step))
+    start = math.floor(low / step) * step
+    edges = start + step * np.arange(math.floor((high - start) / step) + 2)
+    open_ended = top >= edges[-1]
+    counts = np.histogram(values, [*edges[:-1], np.inf] if open_ended else edges)[0]
+    return [
+        {'low': _round(edges[i]), 'high': None if open_ended and i == len(counts) - 1 else _round(edges[i + 1]),
+         'count': int(count), 'percent': round(100 * float(count) / values.size, 1)}
+        for i, count in enumerate(counts)
+    ]
+
+
+def price_buckets(prices, buckets=PRICE_BUCKETS):
+    """
+    فئات سعر من توزيع البيانات نفسها: حدود عند المئينات المتساوية، مقرّبة
+    لأرقام مستديرة، فتحمل كل فئة نحو الحصة نفسها من الكتب.
+    """
+    prices = _present(prices)
+    if not prices.size:
+        return []
+    cuts = np.percentile(prices, np.linspace(0, 100, buckets + 1)[1:-1])
+    edges = sorted({_round_nice(cut) for cut in cuts} - {0.0})
+    edges = [edge for edge in edges if prices.min() < edge <= prices.max()]
+    if not edges:
+        return []
+    counts = np.histogram(prices, [-np.inf, *edges, np.inf])[0]
+    bounds = [None, *edges, None]
+    return [
+        {'low': low, 'high': high, 'count': int(count)}
+        for low, high, count in zip(bounds, bounds[1:], counts)
+    ]
+
+
+def _grouped_percentiles(groups, values, size, qs):
+    """مئينات لكل مجموعة بفرز واحد (المجموعة ثم القيمة) وفهرسة مباشرة، مع استبعاد nan."""
+    present = ~np.isnan(values)
+    groups, values = groups[present], values[present]
+    counts = np.bincount(groups, minlength=size)
+    result = {q: np.full(size, np.nan) for q in qs}
+    if not values.size:
+        return result
+    ordered = values[np.lexsort((values, groups))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    filled = counts > 0
+    for q in qs:
+        # الاستيفاء الخطي نفسه في np.percentile
+        position = starts + (counts - 1).clip(min=0) * q / 100
+        low = np.floor(position).astype(np.int64).clip(max=ordered.size - 1)
+        high = np.ceil(position).astype(np.int64).clip(max=ordered.size - 1)
+        value = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+        result[q] = np.where(filled, value, np.nan)
+    return result
+
+
+def breakdown(keys, data, labels):
+    """ملخص الأسعار والتأجير لكل قيمة من keys، مرتباً بعدد الكتب."""
+    if not keys.size:
+        return []
+    codes, groups = np.unique(keys, return_inverse=True)
+    size = codes.size
+    price = data['price']
+    total = data['total_retal']
+    books = np.bincount(groups, minlength=size)
+    priced = np.bincount(groups, weights=~np.isnan(price), minlength=size)
+    value = np.bincount(groups, weights=np.nan_to_num(price), minlength=size)
+    rentals = np.bincount(groups, weights=data['status'] == 'rental', minlength=size)
+    retal_total = np.bincount(groups, weights=np.nan_to_num(total), minlength=size)
+    booked = np.bincount(groups, weights=np.where(data['status'] == 'rental', np.nan_to_num(total), 0), minlength=size)
+    middle = _grouped_percentiles(groups, price, size, (50, 90))
+    rows = [
+        {
+            'key': codes[i].item(),
+            'label': labels.get(codes[i].item()) or '-',
+            'books': int(books[i]),
+            'priced': int(priced[i]),
+            'avg_price': _round(value[i] / priced[i]) if priced[i] else None,
+            'median_price': _round(middle[50][i]),
+            'p90_price': _round(middle[90][i]),
+            'price_total': _round(value[i]),
+            'rentals': int(rentals[i]),
+            'total_retal': _round(retal_total[i]),
+            'booked_revenue': _round(booked[i]),
+        }
+        for i in range(size)
+    ]
+    return sorted(rows, key=lambda row: -row['books'])
+
+
+def projections(data, days=PROJECTION_DAYS):
+    """
+    إيرادات التأجير من total_retal: المحجوز (الكتب المؤجرة حالياً لدورة كاملة)،
+    والممكن (المتاحة المفعلة لو أُجرت مرة)، ومعدل يومي من السعر اليومي للمؤجرة.
+    """
+    rented = data['status'] == 'rental'
+    open_ = (data['status'] == 'availble') & data['active']
+    total = np.nan_to_num(data['total_retal'])
+    daily = float(np.nansum(data['retal_price_day'][rented]))
+    return {
+        'booked': _round(total[rented].sum()),
+        'pipeline': _round(total[open_].sum()),
+        'daily_rate': _round(daily),
+        'days': days,
+        'projected': _round(daily * days),
+        'rentable': int(np.count_nonzero(open_ & (total > 0))),
+    }
+
+
+def _summary(values):
+    present = _present(values)
+    return {
+        'count': int(present.size),
+        'avg': _round(present.mean()) if present.size else None,
+        'min': _round(present.min()) if present.size else None,
+        'max': _round(present.max()) if present.size else None,
+        'percentiles': percentiles(present),
+        'histogram': histogram(present),
+    }
+
+
+def compute_report(queryset=None):
+    data = columns(queryset)
+    statuses = dict(Book.STATUS_CHOICES)
+    return {
+        'books': int(data['price'].size),
+        'price': _summary(data['price']),
+        'retal_price_day': _summary(data['retal_price_day']),
+        'retal_period': _summary(data['retal_period']),
+        'total_retal': _summary(data['total_retal']),
+        'projections': projections(data),
+        'price_buckets': price_buckets(data['price']),
+        'by_category': breakdown(data['category'], data, dict(Category.objects.values_list('id', 'name'))),
+        'by_course': breakdown(data['course'], data, dict(Course.objects.values_list('id', 'name'))),
+        'by_status': breakdown(data['status'], data, statuses),
+    }
+
+
+def get_report():
+    return catalogue.get_or_set('price-report', compute_report, REPORT_CACHE_TIMEOUT)
@@ -13,4 +13,7 @@ class LmsAppConfig(AppConfig):
     name = 'lms_app'
 
     def ready(self):
-        CharField.register_lookup(EndsWithZ)
\ No newline at end of file
+        CharField.register_lookup(EndsWithZ)
+        from . import checks, signals  # noqa: F401
+        from . import profiling
+        profiling.install()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+نسخ async من عروض القراءة، تُستخدم بدل المتزامنة عند التشغيل عبر ASGI.
+
+الاستعلامات المستقلة (الصفحة، العدادات، التصنيفات) تُطلق معاً بـ asyncio.gather
+عبر ORM غير المتزامن، ورسم القوالب يتم في sync_to_async لأنه متزامن.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from .autocomplete import course_index
+from .caching import acatalogue_cached
+from .models import Book, Category, Course
+from .routers import read_replica, replica_reads
+from .pagination import BookCursorPagination, akeyset_page, parse_cursor
+from .serializers import BookSerializer, requested_fields
+from .stats import aget_book_stats
+from . import views
+
+
+async def _all(queryset):
+    return [item async for item in queryset]
+
+
+async def _books_page(query, cursor, course=None):
+    if query:
+        # البحث النصي استعلام SQL خام عبر cursor، فيبقى متزامناً
+        return await sync_to_async(views._books_page)(query, cursor, course)
+    return await akeyset_page(views._catalogue_queryset(course=course), cursor)
+
+
+async def index(request):
+    if request.method != 'GET':
+        return await sync_to_async(views.index)(request)
+    with replica_reads():
+        (page, next_cursor), stats, categories = await asyncio.gather(
+            akeyset_page(views._catalogue_queryset(), parse_cursor(request.GET.get('cursor'))),
+            aget_book_stats(),
+            _all(Category.objects.all()),
+        )
+        context = views._index_context(categories, page, next_cursor, stats)
+        return await sync_to_async(render)(request, 'pages/index.html', context)
+
+
+@read_replica
+async def books(request):
+    query = request.GET.get('q')
+    course = parse_cursor(request.GET.get('course'))
+    (page, next_cursor), categories, courses = await asyncio.gather(
+        _books_page(query, parse_cursor(request.GET.get('cursor')), course),
+        _all(Category.objects.all()),
+        _all(Course.objects.all()),
+    )
+    context = views._books_context(categories, courses, page, next_cursor, query, course)
+    return await sync_to_async(render)(request, 'pages/books.html', context)
+
+
+@read_replica
+async def books_more(request):
+    layout = request.GET.get('layout')
+    if layout not in views.CARD_TEMPLATES:
+        layout = 'books'
+    query = request.GET.get('q')
+    course = parse_cursor(request.GET.get('course'))
+    page, next_cursor = await _books_page(query, parse_cursor(request.GET.get('cursor')), course)
+    html = await sync_to_async(render_to_string)(views.CARD_TEMPLATES[layout], {'books': page}, request=request)
+    response = HttpResponse(html)
+    response['X-Next-Url'] = views._next_url(layout, next_cursor, query, course)
+    return response
+
+
+@read_replica
+async def course_autocomplete(request):
+    term = request.GET.get('term', '')
+    return views._autocomplete_response(request, term, await course_index.acurrent_generation())
+
+
+def _paginate(queryset, request):
+    # نفس BookCursorPagination في BookViewSet، فالمؤشرات المشفرة ورابط previous
+    # واحدة في المسارين ويصلح مؤشر أحدهما في الآخر
+    paginator = BookCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    return {
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': BookSerializer(page, many=True, context={'request': request}).data,
+    }
+
+
+_book_list_view = views.BookViewSet.as_view({'get': 'list', 'post': 'create'})
+
+
+@csrf_exempt
+async def api_books(request):
+    # الإنشاء وبقية الطرق تبقى في BookViewSet، هنا القراءة فقط
+    if request.method != 'GET':
+        return await sync_to_async(_book_list_view)(request)
+    return await _api_books_list(request)
+
+
+@read_replica
+@acatalogue_cached
+async def _api_books_list(request):
+    """
+    قائمة الكتب في الواجهة البرمجية بنفس فلاتر BookViewSet وحقوله.
+
+    الترقيم بـ BookCursorPagination نفسه، ويعمل في sync_to_async لأن CursorPagination متزامن.
+    """
+    api_request = Request(request)
+    try:
+        queryset = views.filter_api_books(
+            views.api_books_queryset(Book.objects.all(), requested_fields(api_request)),
+            api_request.query_params,
+        )
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+    try:
+        return await sync_to_async(_paginate)(queryset, api_request)
+    except NotFound as exc:
+        # مؤشر غير صالح، كما يرده BookViewSet
+        return JsonResponse({'detail': exc.detail}, status=404)
+
+
+@read_replica
+@acatalogue_cached
+async def api_book_stats(request):
+    return views.api_stats(await aget_book_stats())
@@ -0,0 +1,122 @@
+import threading
+from asgiref.sync import sync_to_async
+from bisect import bisect_left
+from django.db import DatabaseError
+from .caching import CacheNamespace
+from .models import Course
+from .search import index_text, normalize
+
+# الإصدار هو جيل الفهرس: يزيد مع كل تعديل على الدورات
+courses_cache = CacheNamespace('courses', timeout=60 * 60 * 24)
+
+
+class CoursePrefixIndex:
+    """
+    فهرس بادئات لأسماء الدورات في الذاكرة.
+
+    نخزن قائمة مرتبة من (كلمة، معرف الدورة) لكل كلمة في الاسم وللاسم كاملاً،
+    فيصبح البحث عن بادئة bisect واحداً ثم مروراً على النتائج المتجاورة.
+    رقم الجيل المشترك في الكاش يُعلم بقية العمليات بأن الفهرس تغير،
+    والفهرس المبني لكل جيل يُخزّن في الكاش فتحمّله العمليات الأخرى دون قاعدة البيانات.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._names = {}
+        self.generation = None
+
+    @staticmethod
+    def _course_keys(course_id, name):
+        keys = {normalize(name).strip()}
+        keys.update(index_text(name).split())
+        return [(key, course_id) for key in keys if key]
+
+    def _build(self, courses):
+        keys = []
+        for course_id, name in courses:
+            keys.extend(self._course_keys(course_id, name))
+        keys.sort()
+        return keys
+
+    def build(self, generation):
+        """يبني فهرس الجيل ويخزّنه في الكاش المشترك، أو يحمّله منه إن وُجد."""
+        built = courses_cache.get('index', version=generation)
+        if built is None:
+            courses = list(Course.objects.order_by('id').values_list('id', 'name'))
+            built = (self._build(courses), courses)
+            courses_cache.set('index', built, version=generation)
+        return built
+
+    def warm(self):
+        generation = courses_cache.version()
+        keys, courses = self.build(generation)
+        with self._lock:
+            self._keys = keys
+            self._names = dict(courses)
+            self.generation = generation
+
+    def update(self, course_id, name):
+        if self.generation is None:
+            # لم يُحمّل الفهرس بعد في هذه العملية، سيُبنى كاملاً عند أول طلب
+            _bump_generation()
+            return
+        with self._lock:
+            # نبني قائمة جديدة ثم نستبدلها حتى لا يرى القراء قائمة نصف محدثة
+            keys = [key for key in self._keys if key[1] != course_id]
+            for key in self._course_keys(course_id, name):
+                keys.insert(bisect_left(keys, key), key)
+            self._keys = keys
+            self._names = {**self._names, course_id: name}
+        self.generation = _bump_generation()
+
+    def remove(self, course_id):
+        if self.generation is None:
+            _bump_generation()
+            return
+        with self._lock:
+            self._keys = [key for key in self._keys if key[1] != course_id]
+            self._names = {k: v for k, v in self._names.items() if k != course_id}
+        self.generation = _bump_generation()
+
+    def current_generation(self):
+        """يعيد بناء الفهرس إذا غيّرت عملية أخرى الدورات منذ آخر تحميل."""
+        if courses_cache.version() != self.generation:
+            self.warm()
+        return self.generation
+
+    async def acurrent_generation(self):
+        if await courses_cache.aversion() != self.generation:
+            await sync_to_async(self.warm)()
+        return self.generation
+
+    def lookup(self, term, limit=10):
+        term = normalize(term).strip()
+        keys, names = self._keys, self._names
+        if not term:
+            return [names[course_id] for course_id in sorted(names)[:limit]]
+        # النتائج بترتيب أبجدي للكلمة المطابقة، فنتوقف بعد أول limit دورة
+        matches = []
+        for key, course_id in keys[bisect_left(keys, (term,)):]:
+            if not key.startswith(term):
+                break
+            if course_id not in matches:
+                matches.append(course_id)
+                if len(matches) == limit:
+                    break
+        return [names[course_id] for course_id in matches]
+
+
+def _bump_generation():
+    return courses_cache.bump()
+
+
+course_index = CoursePrefixIndex()
+
+
+def warm_course_index():
+    # قد تعمل العملية قبل تنفيذ migrate، عندها نكتفي بالتحميل عند أول طلب
+    try:
+        course_index.warm()
+    except DatabaseError:
+        pass
@@ -0,0 +1,6 @@
+"""
+أدوات قياس الأداء: توليد بيانات تجريبية وسيناريوهات زمنية للمسارات الساخنة.
+
+تُشغّل عبر الأمرين seed_benchmark_data وrun_benchmarks، ويُفضّل على قاعدة
+بيانات منفصلة حتى لا تختلط البيانات التجريبية بالحقيقية.
+"""
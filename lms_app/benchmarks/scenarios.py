@@ -0,0 +1,185 @@
+import platform
+import statistics
+import subprocess
+import time
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import translation
+from lms_app.exports import streaming_export
+from lms_app.models import Book
+from lms_app import stats, tags
+
+BENCH_ADMIN = 'bench-admin'
+# عنوان خارج INTERNAL_IPS حتى لا يظهر شريط التصحيح في القياس
+REMOTE_ADDR = '10.255.0.1'
+EXPORT_ROWS = 5000
+
+
+class ScenarioFailed(Exception):
+    """سيناريو لم يُرجع 200، فقياسه لا معنى له."""
+
+
+class Scenario:
+    """مسار ساخن واحد: دالة تُنفّذ الطلب وتتحقق من نجاحه."""
+
+    def __init__(self, name, run, admin=False):
+        self.name = name
+        self.run = run
+        self.admin = admin
+
+
+def _get(path, **params):
+    def run(client):
+        response = client.get(path, params, REMOTE_ADDR=REMOTE_ADDR)
+        if response.status_code != 200:
+            raise ScenarioFailed(f"{path}: {response.status_code}")
+        # نستهلك الاستجابات المتدفقة حتى يُحسب توليدها كاملاً
+        if response.streaming:
+            for _chunk in response.streaming_content:
+                pass
+        return response
+    return run
+
+
+def _export(client):
+    # iter_rows يرتّب الاستعلام بنفسه، فنحدد النطاق بمعرف الصف الأخير بدل الاقتطاع
+    last_id = Book.objects.order_by('id').values_list('id', flat=True)[EXPORT_ROWS - 1:EXPORT_ROWS].first()
+    queryset = Book.objects.filter(id__lte=last_id) if last_id else Book.objects.all()
+    for _chunk in streaming_export(queryset, 'csv').streaming_content:
+        pass
+
+
+def _stats(client):
+    stats.get_book_stats()
+
+
+def scenarios():
+    # مسارات الموقع ببادئة اللغة، وLANGUAGE_CODE قد لا يكون ضمن LANGUAGES
+    with translation.override(settings.LANGUAGES[0][0]):
+        return _scenarios()
+
+
+def _scenarios():
+    search_term = Book.objects.values_list('title', flat=True).order_by('id').first() or 'a'
+    search_term = search_term.split()[0]
+    top_tags = [name for name, _count in tags.cloud(limit=2)]
+    return [
+        Scenario('dashboard', _get(reverse('index'))),
+        Scenario('catalogue', _get(reverse('books'))),
+        Scenario('search', _get(reverse('books'), q=search_term)),
+        Scenario('api_list', _get(reverse('book-list'))),
+        Scenario('api_tags', _get(reverse('book-list'), tags=','.join(top_tags[:1]))),
+        Scenario('api_stats', _get(reverse('book-stats'))),
+        Scenario('stats', _stats),
+        Scenario('autocomplete', _get(reverse('course-autocomplete'), term=search_term[:2])),
+        Scenario('export_csv', _export),
+        Scenario('admin_changelist', _get(reverse('admin:lms_app_book_changelist')), admin=True),
+        Scenario('admin_report', _get(reverse('admin:book-report')), admin=True),
+    ]
+
+
+def _admin_client():
+    User = get_user_model()
+    user = User.objects.filter(**{User.USERNAME_FIELD: BENCH_ADMIN}).first()
+    if user is None:
+        user = User.objects.create_superuser(**{User.USERNAME_FIELD: BENCH_ADMIN, 'password': None})
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def _summary(samples, queries):
+    ordered = sorted(samples)
+    return {
+        'iterations': len(samples),
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'queries': queries,
+    }
+
+
+def measure(scenario, client, iterations, warmup, cold):
+    """
+    يقيس سيناريو واحداً: cold يمسح الكاش قبل كل تكرار، وإلا فالكاش دافئ من التمهيد.
+
+    عدد الاستعلامات من آخر تكرار، فهو ثابت لنفس البيانات ونفس حالة الكاش.
+    """
+    for _ in range(warmup):
+        if cold:
+            cache.clear()
+        scenario.run(client)
+    samples = []
+    queries = 0
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            scenario.run(client)
+            samples.append((time.perf_counter() - start) * 1000)
+        queries = len(captured)
+    return _summary(samples, queries)
+
+
+def run(names=None, iterations=20, warmup=3, modes=('cold', 'warm'), log=print):
+    # عميل الاختبار يرسل Host: testserver، وهو خارج ALLOWED_HOSTS في الإعدادات العادية
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        return _run(names, iterations, warmup, modes, log)
+
+
+def _run(names, iterations, warmup, modes, log):
+    client, admin_client = Client(), None
+    results = {}
+    for scenario in scenarios():
+        if names and scenario.name not in names:
+            continue
+        if scenario.admin and admin_client is None:
+            admin_client = _admin_client()
+        for mode in modes:
+            result = measure(scenario, admin_client if scenario.admin else client, iterations, warmup, mode == 'cold')
+            results[f'{scenario.name}:{mode}'] = result
+            log(f"  {scenario.name + ':' + mode:28} median={result['median_ms']:8.2f}ms "
+                f"p95={result['p95_ms']:8.2f}ms queries={result['queries']}")
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    """ما يلزم لمقارنة تشغيلين: الإيداع والإصدارات وحجم البيانات."""
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'debug': settings.DEBUG,
+        'books': Book.objects.count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(baseline, results):
+    """نسبة تغيّر الوسيط لكل سيناريو مشترك؛ السالب تحسّن."""
+    changes = {}
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and previous['median_ms']:
+            changes[name] = (result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100
+    return changes
@@ -0,0 +1,95 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from lms_app.models import Book, Category, Course, TaggedBook
+from lms_app import events
+from lms_app.tags import resolve as resolve_tags
+
+PREFIX = 'bench'
+WORDS = [
+    'البرمجة', 'الرياضيات', 'الفيزياء', 'الكيمياء', 'التاريخ', 'الأدب', 'الفلسفة', 'الاقتصاد',
+    'python', 'django', 'algebra', 'geometry', 'data', 'networks', 'design', 'history',
+    'مقدمة', 'أساسيات', 'متقدم', 'دليل', 'شرح', 'تطبيقات', 'introduction', 'advanced',
+]
+AUTHORS = ['أحمد', 'محمد', 'سارة', 'ليلى', 'خالد', 'نور', 'John', 'Maria', 'Ali', 'Fatima']
+STATUSES = [choice for choice, _label in Book.STATUS_CHOICES]
+
+
+def _names(rng, count, words=2):
+    return [f"{' '.join(rng.sample(WORDS, words))} {index}" for index in range(count)]
+
+
+def _owners(count):
+    User = get_user_model()
+    usernames = [f'{PREFIX}-owner-{index}' for index in range(count)]
+    User.objects.bulk_create(
+        [User(**{User.USERNAME_FIELD: username, 'password': '!'}) for username in usernames],
+        ignore_conflicts=True,
+    )
+    return list(User.objects.filter(**{f'{User.USERNAME_FIELD}__in': usernames}).values_list('id', flat=True))
+
+
+def _tags(names):
+    return list(resolve_tags(names).values())
+
+
+def _book(rng, category_ids, course_ids, owner_ids):
+    rental = rng.random() < 0.4
+    return Book(
+        title=' '.join(rng.sample(WORDS, 3)),
+        author=f"{rng.choice(AUTHORS)} {rng.choice(AUTHORS)}",
+        pages=rng.randint(40, 900),
+        price=None if rental else Decimal(rng.randint(500, 30000)) / 100,
+        retal_price_day=Decimal(rng.randint(50, 500)) / 100 if rental else None,
+        retal_period=rng.randint(1, 30) if rental else None,
+        active=rng.random() < 0.7,
+        status=rng.choice(STATUSES),
+        published_date=date(2000, 1, 1) + timedelta(days=rng.randint(0, 9000)),
+        category_id=rng.choice(category_ids),
+        course_id=rng.choice(course_ids) if rng.random() < 0.9 else None,
+        owner_id=rng.choice(owner_ids) if owner_ids else None,
+    )
+
+
+def seed(books=10000, categories=12, courses=200, owners=20, tags=60, max_tags=3,
+         seed_value=1, batch_size=2000, log=print):
+    """
+    يولّد N كتاباً بتصنيفات ودورات ووسوم ومالكين عبر bulk_create.
+
+    نفس seed_value يعطي نفس البيانات، فتبقى نتائج القياس قابلة للمقارنة بين الإيداعات.
+    bulk_create لا يشغّل hooks الكتاب، فنسجّل حدث الإنشاء دفعة واحدة كما في import_books، دون PDF.
+    """
+    rng = random.Random(seed_value)
+    category_ids = [
+        Category.objects.get_or_create(name=name)[0].id for name in _names(rng, categories, words=1)
+    ]
+    course_ids = [
+        Course.objects.get_or_create(name=name)[0].id for name in _names(rng, courses)
+    ]
+    owner_ids = _owners(owners)
+    tag_ids = _tags([f'{word}-{index}' for index, word in enumerate(rng.choices(WORDS, k=tags))])
+    log(f"{len(category_ids)} تصنيف، {len(course_ids)} دورة، {len(owner_ids)} مالك، {len(tag_ids)} وسم")
+
+    first_id = last_id = None
+    for start in range(0, books, batch_size):
+        batch = [_book(rng, category_ids, course_ids, owner_ids) for _ in range(min(batch_size, books - start))]
+        with transaction.atomic():
+            created = Book.objects.bulk_create(batch)
+            TaggedBook.objects.bulk_create([
+                TaggedBook(content_object_id=book.id, tag_id=tag_id)
+                for book in created
+                for tag_id in rng.sample(tag_ids, rng.randint(0, max_tags))
+            ])
+        first_id = created[0].id if first_id is None else first_id
+        last_id = created[-1].id
+        log(f"  {start + len(batch)}/{books}")
+
+    if first_id is None:
+        return 0
+    seeded = Book.objects.filter(id__gte=first_id, id__lte=last_id)
+    with transaction.atomic():
+        seeded.recompute_total_retal()
+        events.books_created(seeded, skip=('pdf',))
+    return seeded.count()
@@ -0,0 +1,117 @@
+"""
+زمن الإقلاع البارد لنقاط الدخول: عملية Python جديدة لكل تشغيل مع -X importtime.
+
+"بارد" هنا يعني مفسراً جديداً بلا وحدات محمّلة، أما ملفات .pyc وذاكرة نظام
+الملفات فتبقى دافئة بعد التشغيل التمهيدي، كما في إعادة تشغيل عامل أو خادم.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from django.conf import settings
+from .scenarios import _git_commit
+
+# ما يحدث قبل أن تستطيع نقطة الدخول خدمة أول طلب أو مهمة أو أمر
+ENTRY_POINTS = {
+    'web': (
+        "import lms.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    'worker': (
+        "from lms_app.celery import app\n"
+        "app.loader.import_default_modules()\n"
+    ),
+    'manage': (
+        "from django.core.management import execute_from_command_line\n"
+        "execute_from_command_line(['manage.py', 'help', 'drain_book_events'])\n"
+    ),
+}
+
+
+def parse_importtime(output):
+    """
+    يحوّل مخرجات -X importtime إلى زمن الاستيراد الكلي وزمن كل حزمة بالملّي ثانية.
+
+    الزمن الكلي مجموع الزمن التراكمي للوحدات في المستوى الأعلى، وزمن الحزمة
+    مجموع الزمن الذاتي لوحداتها، فيظهر من يكلّف فعلاً لا من استورده.
+    """
+    total = 0
+    packages = defaultdict(int)
+    modules = 0
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules += 1
+        packages[name.strip().split('.')[0]] += int(self_us)
+        if not name[1:].startswith(' '):
+            total += int(cumulative_us)
+    return {
+        'import_ms': total / 1000,
+        'modules': modules,
+        'packages': {name: us / 1000 for name, us in packages.items()},
+    }
+
+
+def run_once(entry, env=None):
+    environ = dict(os.environ, **(env or {}))
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', ENTRY_POINTS[entry]],
+        cwd=settings.BASE_DIR, env=environ, capture_output=True, text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if process.returncode:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"{entry}: " + '\n'.join(errors[-10:]))
+    return dict(parse_importtime(process.stderr), wall_ms=elapsed)
+
+
+def measure(entry, runs=5, warmup=1, env=None, top=8):
+    for _ in range(warmup):
+        run_once(entry, env)
+    samples = [run_once(entry, env) for _ in range(runs)]
+    walls = [sample['wall_ms'] for sample in samples]
+    packages = defaultdict(list)
+    for sample in samples:
+        for name, ms in sample['packages'].items():
+            packages[name].append(ms)
+    heaviest = sorted(
+        ((name, statistics.median(values)) for name, values in packages.items()),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return {
+        'wall_ms': statistics.median(walls),
+        'wall_min_ms': min(walls),
+        'import_ms': statistics.median(sample['import_ms'] for sample in samples),
+        'modules': samples[-1]['modules'],
+        'packages': dict(heaviest),
+    }
+
+
+def metadata():
+    return {
+        'commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def run(entries=None, environments=(None,), runs=5, warmup=1, top=8, log=print):
+    results = {}
+    for environment in environments:
+        env = {'LMS_ENV': environment} if environment else None
+        label = environment or os.environ.get('LMS_ENV', 'development')
+        for entry in entries or ENTRY_POINTS:
+            result = measure(entry, runs=runs, warmup=warmup, env=env, top=top)
+            results[f'{entry}:{label}'] = result
+            log(
+                f"  {entry:8} {label:12} wall={result['wall_ms']:7.1f}ms (min {result['wall_min_ms']:.1f}) "
+                f"imports={result['import_ms']:7.1f}ms modules={result['modules']}"
+            )
+            log('           ' + ', '.join(f"{name} {ms:.0f}ms" for name, ms in result['packages'].items()))
+    return results
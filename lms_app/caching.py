@@ -0,0 +1,210 @@
+import hashlib
+import time
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils import translation
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+API_CACHE_TIMEOUT = 60 * 15
+
+
+class CacheNamespace:
+    """
+    مساحة مفاتيح في الكاش: كل مفتاح بالشكل lms:<الاسم>:<الإصدار>:<اللاحقة>.
+
+    الإصدار مشترك بين كل العمليات ومرتبط بالتعديلات على النماذج، فزيادته
+    (bump) تُبطل كل مفاتيح المساحة دفعة واحدة دون البحث عنها ومسحها،
+    والمفاتيح القديمة لا تُقرأ بعدها وتنتهي بمهلتها.
+    """
+
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, alias=DEFAULT_CACHE_ALIAS):
+        self.name = name
+        self.timeout = timeout
+        self.alias = alias
+        self.version_key = f'lms:{name}:version'
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def version(self):
+        # نبدأ من الوقت الحالي بالملي ثانية حتى لا يتكرر رقم قديم إذا مُسح الكاش
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, int(time.time() * 1000), None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    async def aversion(self):
+        version = await self.cache.aget(self.version_key)
+        if version is None:
+            await self.cache.aadd(self.version_key, int(time.time() * 1000), None)
+            version = await self.cache.aget(self.version_key)
+        return version
+
+    def bump(self):
+        self.version()
+        try:
+            return self.cache.incr(self.version_key)
+        except ValueError:
+            version = int(time.time() * 1000)
+            self.cache.set(self.version_key, version, None)
+            return version
+
+    def key(self, suffix, version=None):
+        return f'lms:{self.name}:{self.version() if version is None else version}:{suffix}'
+
+    def get(self, suffix, default=None, version=None):
+        return self.cache.get(self.key(suffix, version), default)
+
+    def set(self, suffix, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.cache.set(self.key(suffix, version), value, self._timeout(timeout))
+
+    async def aget(self, suffix, default=None, version=None):
+        version = await self.aversion() if version is None else version
+        return await self.cache.aget(self.key(suffix, version), default)
+
+    async def aset(self, suffix, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = await self.aversion() if version is None else version
+        await self.cache.aset(self.key(suffix, version), value, self._timeout(timeout))
+
+    def get_many(self, suffixes, version=None):
+        version = self.version() if version is None else version
+        keys = {self.key(suffix, version): suffix for suffix in suffixes}
+        return {keys[key]: value for key, value in self.cache.get_many(list(keys)).items()}
+
+    def set_many(self, mapping, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self.version() if version is None else version
+        self.cache.set_many(
+            {self.key(suffix, version): value for suffix, value in mapping.items()}, self._timeout(timeout)
+        )
+
+    def delete_many(self, suffixes, version=None):
+        version = self.version() if version is None else version
+        self.cache.delete_many([self.key(suffix, version) for suffix in suffixes])
+
+    def get_or_set(self, suffix, compute, timeout=DEFAULT_TIMEOUT):
+        version = self.version()
+        value = self.get(suffix, version=version)
+        if value is None:
+            value = compute()
+            self.set(suffix, value, timeout, version=version)
+        return value
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+
+# يزيد مع كل تعديل على الكتب أو التصنيفات أو الدورات
+catalogue = CacheNamespace('catalogue', timeout=API_CACHE_TIMEOUT)
+CATALOGUE_MODIFIED_KEY = 'lms:catalogue:modified'
+
+
+def catalogue_version():
+    return catalogue.version()
+
+
+def catalogue_modified():
+    modified = catalogue.cache.get(CATALOGUE_MODIFIED_KEY)
+    if modified is None:
+        catalogue.cache.add(CATALOGUE_MODIFIED_KEY, int(time.time()), None)
+        modified = catalogue.cache.get(CATALOGUE_MODIFIED_KEY, int(time.time()))
+    return modified
+
+
+def bump_catalogue_version():
+    catalogue.bump()
+    catalogue.cache.set(CATALOGUE_MODIFIED_KEY, int(time.time()), None)
+
+
+def _representation_key(request):
+    accepted = getattr(request, 'accepted_media_type', '')
+    raw = f"{request.build_absolute_uri()}|{translation.get_language()}|{accepted}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _not_modified(request, etag, modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and modified <= since
+
+
+def catalogue_cached(view_method):
+    """
+    GET شرطي وكاش للاستجابة في واجهة الكتب.
+
+    الـ ETag مبني على إصدار الكتالوج والرابط واللغة، فلا نحتاج لحساب
+    الاستجابة لنعرف إن تغيرت: العميل الذي لم يتغير عليه شيء يأخذ 304،
+    والبقية تُخدم من الكاش المفهرس بنفس المفتاح حتى يتغير الإصدار.
+    """
+    # DRF يُحمَّل مع واجهة الكتب، لا مع كل من يستورد الكاش (الإدارة والأوامر والعامل)
+    from rest_framework import status
+    from rest_framework.response import Response
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version = catalogue_version()
+        modified = catalogue_modified()
+        representation = _representation_key(request)
+        etag = f'"{version}-{representation}"'
+
+        if _not_modified(request, etag, modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = catalogue.get(f'api:{representation}', version=version)
+            if data is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                catalogue.set(f'api:{representation}', response.data, version=version)
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
+
+
+def _catalogue_state():
+    return catalogue_version(), catalogue_modified()
+
+
+def acatalogue_cached(view):
+    """
+    نسخة catalogue_cached للعروض غير المتزامنة التي ترجع بيانات JSON.
+
+    نفس إصدار الكتالوج في الـ ETag ومفتاح الكاش، فيُبطل مع أي تعديل كالنسخة المتزامنة.
+    إذا أرجع العرض HttpResponse (خطأ مثلاً) يُمرّر كما هو دون تخزين.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        version, modified = await sync_to_async(_catalogue_state)()
+        representation = _representation_key(request)
+        etag = f'"{version}-{representation}"'
+
+        if _not_modified(request, etag, modified):
+            response = HttpResponseNotModified()
+        else:
+            data = await catalogue.aget(f'api:{representation}', version=version)
+            if data is None:
+                data = await view(request, *args, **kwargs)
+                if isinstance(data, HttpResponse):
+                    return data
+                await catalogue.aset(f'api:{representation}', data, version=version)
+            response = JsonResponse(data, safe=False)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
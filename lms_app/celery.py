@@ -1,8 +1,12 @@
 import os
 from celery import Celery
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms_app.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms.settings')
 
 app = Celery('lms_app')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+from lms_app import profiling  # noqa: E402
+
+profiling.install_task_signals()
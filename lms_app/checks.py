@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def uses_locmem_cache():
+    return settings.CACHES['default']['BACKEND'] == LOCMEM_BACKEND
+
+
+@register('caches', deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """locmem كاش لكل عملية، فلا تصل إبطالات Celery وأوامر الإدارة إلى عمليات الويب."""
+    if not uses_locmem_cache():
+        return []
+    return [Warning(
+        'الكاش الافتراضي locmem خاص بكل عملية؛ مع أكثر من عملية تبقى الصفحات والعدادات قديمة '
+        'حتى انتهاء مهلة الكاش.',
+        hint="استخدم LMS_CACHE_BACKEND=file أو redis.",
+        id='lms_app.W001',
+    )]
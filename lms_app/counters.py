@@ -0,0 +1,244 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import connections, router, transaction
+from django.db.models import Count, Q, Sum
+from .models import BookCounter
+
+KEY_FIELDS = ('category_id', 'course_id', 'status', 'active')
+
+
+def _key(values):
+    return tuple(values[field] for field in KEY_FIELDS)
+
+
+def _book_state(book, initial=False):
+    if initial:
+        values = {field: book.initial_value(field) for field in KEY_FIELDS + ('price',)}
+    else:
+        values = {field: getattr(book, field) for field in KEY_FIELDS + ('price',)}
+    values['active'] = bool(values['active'])
+    return _key(values), values['price']
+
+
+def _deltas():
+    return defaultdict(lambda: [0, 0, Decimal(0)])
+
+
+def _add(deltas, key, price, sign=1):
+    delta = deltas[key]
+    delta[0] += sign
+    if price is not None:
+        delta[1] += sign
+        delta[2] += sign * Decimal(price)
+
+
+def grouped(queryset):
+    """يجمع كتب الاستعلام حسب مفتاح العداد: عدد الكتب وعدد المسعّر منها ومجموع أسعارها."""
+    return queryset.order_by().values(*KEY_FIELDS).annotate(
+        group_count=Count('id'), group_priced=Count('price'), group_price_total=Sum('price'),
+    )
+
+
+def _add_groups(deltas, groups, sign=1, changes=None):
+    for group in groups:
+        values = dict(group, **(changes or {}))
+        delta = deltas[_key(values)]
+        delta[0] += sign * group['group_count']
+        delta[1] += sign * group['group_priced']
+        delta[2] += sign * (group['group_price_total'] or 0)
+
+
+# صفوف كل INSERT، أقل من حد متغيرات SQLite (7 قيم للصف)
+UPSERT_BATCH_SIZE = 500
+
+
+def _upsert_sql(connection, rows):
+    opts = BookCounter._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    key = [qn(opts.get_field(field).column) for field in KEY_FIELDS]
+    amounts = [qn(opts.get_field(field).column) for field in ('count', 'priced', 'price_total')]
+    placeholders = ', '.join(['(%s)' % ', '.join(['%s'] * (len(key) + len(amounts)))] * rows)
+    # الهدف هو تعابير القيد book_counter_key_unique نفسها، وإلا رفضت قاعدة البيانات ON CONFLICT
+    target = f"COALESCE({key[0]}, 0), COALESCE({key[1]}, 0), COALESCE({key[2]}, ''), {key[3]}"
+    updates = ', '.join(f"{column} = {table}.{column} + excluded.{column}" for column in amounts)
+    return (
+        f"INSERT INTO {table} ({', '.join(key + amounts)}) VALUES {placeholders} "
+        f"ON CONFLICT ({target}) DO UPDATE SET {updates}"
+    )
+
+
+def apply(deltas):
+    """
+    يطبّق الفروقات بـ INSERT ... ON CONFLICT DO UPDATE لكل دفعة مفاتيح: ينشئ صف
+    المفتاح أو يضيف إليه في العبارة نفسها، فلا قراءة قبل الكتابة ولا صفوف مكررة.
+    """
+    rows = [
+        (*key, count, priced, price_total)
+        for key, (count, priced, price_total) in deltas.items()
+        if count or priced or price_total
+    ]
+    if not rows:
+        return
+    using = router.db_for_write(BookCounter)
+    connection = connections[using]
+    price_field = BookCounter._meta.get_field('price_total')
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            params = []
+            for *key, count, priced, price_total in batch:
+                params += [*key, count, priced, price_field.get_db_prep_save(Decimal(price_total), connection)]
+            cursor.execute(_upsert_sql(connection, len(batch)), params)
+
+
+def book_saved(book):
+    """فروقات العدادات لحفظ كتاب واحد (فارغة إن لم يتغير مفتاحه ولا سعره)."""
+    # نحتفظ بآخر حالة احتسبناها، لأن الحالة الأولية في lifecycle لا تتجدد إلا بعد الـ commit
+    previous = book.__dict__.get('_counter_state')
+    if previous is None and book.initial_value('id') is not None:
+        previous = _book_state(book, initial=True)
+    current = _book_state(book)
+    deltas = _deltas()
+    if previous == current:
+        return deltas
+    if previous is not None:
+        _add(deltas, previous[0], previous[1], sign=-1)
+    _add(deltas, current[0], current[1])
+    book._counter_state = current
+    return deltas
+
+
+def book_deleted(book):
+    previous = book.__dict__.pop('_counter_state', None) or _book_state(book, initial=True)
+    deltas = _deltas()
+    _add(deltas, previous[0], previous[1], sign=-1)
+    return deltas
+
+
+def added(queryset):
+    """فروقات كتب أُدخلت دون hooks (bulk_create)."""
+    deltas = _deltas()
+    _add_groups(deltas, grouped(queryset))
+    return deltas
+
+
+def normalize_changes(changes):
+    """يحوّل تغييرات update() إلى حقول المفتاح (category -> category_id)، ويرفض غيرها."""
+    normalized = {}
+    for field, value in changes.items():
+        name = field if field in KEY_FIELDS else f'{field}_id'
+        if name not in KEY_FIELDS:
+            raise ValueError(f"update_books لا يدعم الحقل {field}")
+        normalized[name] = getattr(value, 'pk', value)
+    return normalized
+
+
+def moved(groups, changes):
+    """
+    فروقات نقل مجموعات grouped() (المقروءة قبل التحديث) إلى مفاتيحها الجديدة،
+    فلا نحتاج لإعادة قراءة الصفوف بعد تغيّرها.
+    """
+    deltas = _deltas()
+    _add_groups(deltas, groups, sign=-1)
+    _add_groups(deltas, groups, changes=changes)
+    return deltas
+
+
+def removed(groups):
+    deltas = _deltas()
+    _add_groups(deltas, groups, sign=-1)
+    return deltas
+
+
+def merge(target, deltas):
+    for key, (count, priced, price_total) in deltas.items():
+        delta = target[key]
+        delta[0] += count
+        delta[1] += priced
+        delta[2] += price_total
+    return target
+
+
+def dump(deltas):
+    """الفروقات كقائمة صالحة لـ JSON (المفتاح ثم العدد والمسعّر والمجموع كنص)."""
+    return [
+        [*key, count, priced, str(price_total)]
+        for key, (count, priced, price_total) in deltas.items()
+        if count or priced or price_total
+    ]
+
+
+def load(rows, target=None):
+    deltas = _deltas() if target is None else target
+    width = len(KEY_FIELDS)
+    for row in rows:
+        delta = deltas[tuple(row[:width])]
+        delta[0] += row[width]
+        delta[1] += row[width + 1]
+        delta[2] += Decimal(row[width + 2])
+    return deltas
+
+
+def expected_counters(book_model):
+    return {
+        _key(group): (group['group_count'], group['group_priced'], group['group_price_total'] or Decimal(0))
+        for group in grouped(book_model.objects.all())
+    }
+
+
+def rebuild(book_model, counter_model):
+    """يعيد بناء جدول العدادات من جدول الكتب، ويرجع عدد المفاتيح التي كانت خاطئة."""
+    expected = expected_counters(book_model)
+    with transaction.atomic():
+        current = defaultdict(lambda: [0, 0, Decimal(0)])
+        for row in counter_model.objects.values(*KEY_FIELDS, 'count', 'priced', 'price_total'):
+            values = current[_key(row)]
+            values[0] += row['count']
+            values[1] += row['priced']
+            values[2] += row['price_total']
+        drifted = sum(
+            1 for key in set(expected) | set(current)
+            if tuple(current.get(key, (0, 0, Decimal(0)))) != expected.get(key, (0, 0, Decimal(0)))
+        )
+        counter_model.objects.all().delete()
+        counter_model.objects.bulk_create([
+            counter_model(**dict(zip(KEY_FIELDS, key)), count=count, priced=priced, price_total=price_total)
+            for key, (count, priced, price_total) in expected.items()
+        ])
+    return drifted
+
+
+def _totals_aggregates():
+    return dict(
+        total_books=Sum('count', default=0),
+        active_count=Sum('count', filter=Q(active=True), default=0),
+        sold_count=Sum('count', filter=Q(status='sold'), default=0),
+        rental_count=Sum('count', filter=Q(status='rental'), default=0),
+        availble_count=Sum('count', filter=Q(status='availble'), default=0),
+        priced=Sum('priced', default=0),
+        price_total=Sum('price_total'),
+    )
+
+
+def _by_category():
+    return BookCounter.objects.order_by().values('category').annotate(count=Sum('count')).filter(count__gt=0)
+
+
+def _finish_totals(stats, by_category):
+    priced = stats.pop('priced')
+    price_total = stats.pop('price_total')
+    stats['avg_price'] = (price_total / priced).quantize(Decimal('0.01')) if priced else None
+    stats['books_by_category'] = by_category
+    return stats
+
+
+def totals():
+    """عدادات لوحة التحكم من جدول العدادات: صف لكل مفتاح بدل مسح كل الكتب."""
+    stats = BookCounter.objects.aggregate(**_totals_aggregates())
+    return _finish_totals(stats, list(_by_category()))
+
+
+async def atotals():
+    stats = await BookCounter.objects.aaggregate(**_totals_aggregates())
+    return _finish_totals(stats, [row async for row in _by_category()])
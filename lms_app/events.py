@@ -0,0 +1,371 @@
+"""
+ناقل أحداث الكتب عبر جدول BookEvent (transactional outbox).
+
+الـ hooks والعمليات الجماعية تكتب سجلاً صغيراً في معاملة التغيير نفسها بدل
+تنفيذ آثارها الجانبية فوراً. بعد الـ commit تُقرأ السجلات المعلقة دفعة واحدة،
+وتُدمج (الكتاب المعدّل عشر مرات يُعالج مرة، وفروقات العدادات تُجمع لكل مفتاح)،
+ثم توزّع على المستهلكين:
+
+- المستهلكون داخل المعاملة (العدادات، فهرس البحث) ينفّذون مع تسجيل استلامهم في
+  BookEvent.delivered في معاملة واحدة، فيُطبّق كل سجل عليهم مرة واحدة بالضبط.
+- البقية (الكاش، PDF، السجل) تعمل بعد commit تلك المعاملة، ويُسجَّل استلامها بعد
+  نجاحها، فتُسلَّم "مرة على الأقل": فشلها يعيدها في تصريف لاحق.
+
+السجل يُحذف حين يستلمه كل المستهلكين. المستهلك الذي يفشل يُعاد له السجل بعد مهلة
+تتضاعف مع كل محاولة، وبعد LMS_EVENTS_MAX_ATTEMPTS يُعلَّم السجل dead ويُترك جانباً
+فلا يوقف ما بعده. المستهلك داخل المعاملة إن فشل على الدفعة يُجرَّب على كل سجل وحده،
+فيُعزل السجل المعطوب ويمضي الباقي.
+
+LMS_EVENTS_FLUSH='background' يترك التوزيع للأمر drain_book_events أو مهمة
+drain_book_events_task بدل نهاية كل معاملة، وأحدهما يلزم أيضاً لإعادة المحاولات.
+"""
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Book, BookEvent
+from . import counters, fragments
+
+logger = logging.getLogger('lms.events')
+
+FLUSH_MODE = getattr(settings, 'LMS_EVENTS_FLUSH', 'commit')
+DRAIN_BATCH_SIZE = getattr(settings, 'LMS_EVENTS_DRAIN_BATCH_SIZE', 500)
+MAX_ATTEMPTS = getattr(settings, 'LMS_EVENTS_MAX_ATTEMPTS', 10)
+# مهلة أول إعادة، وتتضاعف بعدها (30 ثانية ثم دقيقة ثم دقيقتان...)
+RETRY_SECONDS = getattr(settings, 'LMS_EVENTS_RETRY_SECONDS', 30)
+# حجز السجلات ريثما تعمل مستهلكات ما بعد الـ commit، فلا يأخذها تصريف آخر معها
+LEASE_SECONDS = 60 * 5
+IDS_PER_EVENT = 1000
+
+CREATED, UPDATED, DELETED = BookEvent.CREATED, BookEvent.UPDATED, BookEvent.DELETED
+# الحقول التي تُسجّل إن تغيّرت، وما يحتاجه كل مستهلك منها
+TRACKED_FIELDS = (
+    'title', 'author', 'course', 'category', 'status', 'active', 'price',
+    'retal_price_day', 'retal_period', 'photo_book', 'photo_author',
+)
+SEARCH_FIELDS = {'title', 'author', 'course'}
+# تُحفظ قيمتها الجديدة لرسائل السجل
+LOGGED_FIELDS = ('active', 'status')
+
+_consumers = []
+_local = threading.local()
+
+
+def consumer(name, transactional=False):
+    """يسجّل مستهلكاً يستقبل Batch. transactional: ينفّذ داخل معاملة حذف السجلات."""
+    def register(func):
+        _consumers.append((name, func, transactional))
+        return func
+    return register
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def publish(kind, book_ids, fields=(), deltas=None, cards=(), values=None, skip=()):
+    """
+    يكتب سجل تغيير (أو عدة سجلات لكل IDS_PER_EVENT كتاب) في المعاملة الحالية.
+
+    cards: إصدارات البطاقات السابقة بنفس ترتيب book_ids، وskip: مستهلكون لا يعنيهم التغيير.
+    """
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+    cards = list(cards)
+    events = []
+    for start in range(0, len(book_ids), IDS_PER_EVENT):
+        data = {}
+        if start == 0 and deltas:
+            data['deltas'] = counters.dump(deltas)
+        if cards:
+            data['cards'] = cards[start:start + IDS_PER_EVENT]
+        if values:
+            data['values'] = values
+        # المستهلك المتخطّى كأنه استلم السجل
+        events.append(BookEvent(kind=kind, book_ids=book_ids[start:start + IDS_PER_EVENT],
+                                fields=sorted(fields), data=data, delivered=sorted(skip)))
+    BookEvent.objects.bulk_create(events)
+    if FLUSH_MODE == 'commit':
+        _local.pending = True
+        # robust: فشل أحد المستهلكين لا يُفشل الطلب الذي تم commit له، والسجلات تبقى للتصريف
+        transaction.on_commit(flush, robust=True)
+
+
+def book_saved(book, created):
+    deltas = counters.book_saved(book)
+    if created:
+        publish(CREATED, [book.id], deltas=deltas)
+        return
+    fields = [field for field in TRACKED_FIELDS if book.has_changed(field)]
+    card = fragments.stale_card(book)
+    publish(
+        UPDATED, [book.id], fields, deltas=deltas,
+        cards=[card[1]] if card else (),
+        values={field: getattr(book, field) for field in LOGGED_FIELDS if field in fields},
+    )
+
+
+def book_deleted(book):
+    card = fragments.stale_card(book)
+    publish(DELETED, [book.id], deltas=counters.book_deleted(book), cards=[card[1]] if card else ())
+
+
+def _card_versions(rows):
+    return [fragments.card_version(updated_at) for _book_id, updated_at in rows]
+
+
+def books_created(queryset, skip=()):
+    """لمسارات الإدخال الجماعي (bulk_create) التي لا تشغّل hooks الكتاب."""
+    book_ids = list(queryset.order_by('id').values_list('id', flat=True))
+    publish(CREATED, book_ids, deltas=counters.added(queryset), skip=skip)
+    return len(book_ids)
+
+
+def update_books(queryset, **changes):
+    """
+    بديل queryset.update(**changes) يسجّل التغيير لكل الكتب المتأثرة بسجلات قليلة.
+
+    يدعم حقول مفتاح العداد فقط بقيم ثابتة، أما السعر فيتطلب حفظ كل كتاب.
+    """
+    changes = counters.normalize_changes(changes)
+    with transaction.atomic():
+        rows = list(queryset.order_by('id').values_list('id', 'updated_at'))
+        groups = list(counters.grouped(queryset))
+        # نحدّث updated_at أيضاً كما يفعل save()، فهو إصدار البطاقات المخزنة
+        updated = queryset.update(**changes, updated_at=timezone.now())
+        fields = [field.removesuffix('_id') for field in changes]
+        publish(
+            UPDATED, [book_id for book_id, _updated_at in rows], fields,
+            deltas=counters.moved(groups, changes), cards=_card_versions(rows),
+            values={field: changes[field] for field in LOGGED_FIELDS if field in changes},
+        )
+    return updated
+
+
+def delete_books(queryset):
+    with transaction.atomic():
+        rows = list(queryset.order_by('id').values_list('id', 'updated_at'))
+        groups = list(counters.grouped(queryset))
+        deleted = queryset.delete()
+        publish(DELETED, [book_id for book_id, _updated_at in rows],
+                deltas=counters.removed(groups), cards=_card_versions(rows))
+    return deleted
+
+
+class Batch:
+    """السجلات المعلقة بعد الدمج: كل كتاب يظهر مرة واحدة بحالته النهائية."""
+
+    def __init__(self, events):
+        self.created = set()
+        self.updated = {}
+        self.deleted = set()
+        self.deltas = defaultdict(lambda: [0, 0, 0])
+        self.cards = []
+        self.values = defaultdict(dict)
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        counters.load(event.data.get('deltas', ()), self.deltas)
+        self.cards.extend(zip(event.book_ids, event.data.get('cards', ())))
+        if event.kind == CREATED:
+            self.created.update(event.book_ids)
+        elif event.kind == UPDATED:
+            for book_id in event.book_ids:
+                if book_id not in self.created:
+                    self.updated.setdefault(book_id, set()).update(event.fields)
+                for field, value in event.data.get('values', {}).items():
+                    self.values[field][book_id] = value
+        else:
+            for book_id in event.book_ids:
+                # أُنشئ وحُذف في نفس الدفعة: لا PDF ولا فهرسة
+                self.created.discard(book_id)
+                self.updated.pop(book_id, None)
+                for values in self.values.values():
+                    values.pop(book_id, None)
+            self.deleted.update(event.book_ids)
+
+    def __bool__(self):
+        return bool(self.created or self.updated or self.deleted)
+
+    def changed(self, fields):
+        """الكتب الجديدة والمعدّلة في أحد الحقول المعطاة."""
+        return self.created | {book_id for book_id, changed in self.updated.items() if changed & fields}
+
+
+def _pending(event, name):
+    return name not in event.delivered
+
+
+def _batch(events, batches):
+    # المستهلكون الذين لم يستلموا السجلات نفسها يتشاركون دفعة واحدة
+    key = tuple(event.id for event in events)
+    if key not in batches:
+        batches[key] = Batch(events)
+    return batches[key]
+
+
+def _deliver(name, func, events, failed, isolate, batches):
+    """
+    يسلّم المستهلك دفعة السجلات التي لم يستلمها، ويسجّل اسمه فيها عند النجاح.
+
+    isolate: عند الفشل يُعاد كل سجل وحده داخل savepoint، فلا يوقف سجل معطوب
+    الدفعة كلها. مستهلكات ما بعد الـ commit لا تُعزل، ففشلها غالباً تعطل خدمة
+    (الكاش أو الوسيط) وتكراره لكل سجل يضاعف الانتظار فقط.
+    """
+    events = [event for event in events if _pending(event, name)]
+    if not events:
+        return
+    try:
+        if isolate:
+            with transaction.atomic():
+                func(_batch(events, batches))
+        else:
+            func(_batch(events, batches))
+    except Exception:
+        logger.exception("فشل مستهلك الأحداث %s (%d سجل)", name, len(events))
+        if isolate and len(events) > 1:
+            for event in events:
+                _deliver(name, func, [event], failed, isolate, batches)
+        else:
+            failed.update(event.id for event in events)
+        return
+    for event in events:
+        event.delivered.append(name)
+
+
+def _record(events, failed, lease=None):
+    """يحذف ما استلمه كل المستهلكين، ويحفظ الاستلام والمحاولات لما بقي."""
+    names = {name for name, _func, _transactional in _consumers}
+    done = [event.id for event in events if names <= set(event.delivered)]
+    if done:
+        BookEvent.objects.filter(id__in=done).delete()
+    remaining = [event for event in events if event.id not in done]
+    now = timezone.now()
+    for event in remaining:
+        if event.id in failed:
+            event.attempts += 1
+            event.dead = event.attempts >= MAX_ATTEMPTS
+            event.retry_at = now + timedelta(seconds=RETRY_SECONDS * 2 ** (event.attempts - 1))
+            if event.dead:
+                logger.error("سجل الأحداث #%d تجاوز %d محاولة وتُرك جانباً", event.id, MAX_ATTEMPTS)
+        else:
+            event.retry_at = now + timedelta(seconds=lease) if lease else None
+    if remaining:
+        BookEvent.objects.bulk_update(remaining, ['delivered', 'attempts', 'retry_at', 'dead'])
+
+
+def _ready():
+    return BookEvent.objects.filter(dead=False).filter(Q(retry_at__isnull=True) | Q(retry_at__lte=timezone.now()))
+
+
+def _run_after_commit(events):
+    # السجلات محجوزة (retry_at) منذ المعاملة السابقة، فنكمل بالكائنات نفسها دون إعادة قراءتها
+    failed = set()
+    batches = {}
+    for name, func, transactional in _consumers:
+        if not transactional:
+            _deliver(name, func, events, failed, False, batches)
+    with transaction.atomic():
+        _record(events, failed)
+
+
+def drain(limit=DRAIN_BATCH_SIZE):
+    """يوزّع السجلات الجاهزة على دفعات من limit سجل، ويرجع عدد السجلات."""
+    total = 0
+    after = 0
+    while True:
+        with transaction.atomic():
+            # select_for_update مع skip_locked حيث يدعمه المحرك، وفي SQLite يكفي قفل الكتابة
+            # الذي تحجزه المعاملة (transaction_mode=IMMEDIATE) لمنع تصريف السجلات مرتين
+            events = list(
+                _ready().select_for_update(skip_locked=True).filter(id__gt=after).order_by('id')[:limit]
+            )
+            if not events:
+                break
+            # السجلات التي بقيت بعد فشل لا تُعاد في هذا التصريف نفسه
+            after = events[-1].id
+            failed = set()
+            batches = {}
+            for name, func, transactional in _consumers:
+                if transactional:
+                    _deliver(name, func, events, failed, True, batches)
+            _record(events, failed, lease=LEASE_SECONDS)
+            waiting = [event for event in events if event.id not in failed and any(
+                _pending(event, name) for name, _func, transactional in _consumers if not transactional
+            )]
+            if waiting:
+                transaction.on_commit(partial(_run_after_commit, waiting))
+        total += len(events)
+        if len(events) < limit:
+            break
+    return total
+
+
+def retry_dead():
+    """يعيد السجلات المتروكة إلى التصريف من جديد، ويرجع عددها."""
+    return BookEvent.objects.filter(dead=True).update(dead=False, attempts=0, retry_at=None)
+
+
+def flush():
+    # عدة حفظات في المعاملة تسجّل عدة استدعاءات، أولها يصرّف الكل والبقية لا تفعل شيئاً
+    if not getattr(_local, 'pending', False):
+        return
+    _local.pending = False
+    drain()
+
+
+@consumer('counters', transactional=True)
+def apply_counters(batch):
+    counters.apply(batch.deltas)
+
+
+@consumer('search', transactional=True)
+def update_search_index(batch):
+    from . import search
+    if not search.is_available():
+        return
+    search.remove_books(batch.deleted)
+    for book_ids in _chunks(sorted(batch.changed(SEARCH_FIELDS)), IDS_PER_EVENT):
+        search.index_books(Book.objects.filter(id__in=book_ids))
+
+
+@consumer('catalogue')
+def bump_catalogue(batch):
+    from .caching import bump_catalogue_version
+    if batch:
+        bump_catalogue_version()
+
+
+@consumer('cards')
+def invalidate_cards(batch):
+    fragments.invalidate_cards(batch.cards)
+
+
+@consumer('pdf')
+def schedule_pdfs(batch):
+    from . import pdf
+    if batch.created:
+        pdf.schedule(batch.created)
+
+
+@consumer('log')
+def log_changes(batch):
+    if batch.created:
+        logger.info("تم إنشاء %d كتاب", len(batch.created))
+    if batch.deleted:
+        logger.info("تم حذف %d كتاب", len(batch.deleted))
+    active = Counter(batch.values.get('active', {}).values())
+    if active[True]:
+        logger.info("تم تفعيل %d كتاب", active[True])
+    if active[False]:
+        logger.info("تم إلغاء تفعيل %d كتاب", active[False])
+    for status, count in Counter(batch.values.get('status', {}).values()).items():
+        logger.info("تم تغيير حالة %d كتاب إلى: %s", count, status)
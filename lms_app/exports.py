@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import re
+import secrets
+import time
+from itertools import islice
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import Book
+from .tags import tags_for
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'LMS_EXPORT_CHUNK_SIZE', 2000)
+# خارج MEDIA_ROOT: الملفات لا تُخدم إلا عبر عرض الإدارة بعد التحقق من المستخدم
+EXPORT_ROOT = getattr(settings, 'LMS_EXPORT_ROOT', os.path.join(settings.BASE_DIR, 'private', 'exports'))
+EXPORT_MAX_AGE = getattr(settings, 'LMS_EXPORT_MAX_AGE', 60 * 60 * 24)
+# عدد النطاقات في كل استعلام، حتى لا يتجاوز OR حدود SQLite
+RANGES_PER_QUERY = 100
+
+# الأعمدة بنفس أسماء أمر الاستيراد، والعلاقات تُصدّر بأسمائها
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'author': 'author',
+    'pages': 'pages',
+    'price': 'price',
+    'retal_price_day': 'retal_price_day',
+    'retal_period': 'retal_period',
+    'total_retal': 'total_retal',
+    'active': 'active',
+    'status': 'status',
+    'status_color': 'status_color',
+    'published_date': 'published_date',
+    'category__name': 'category',
+    'course__name': 'course',
+    'owner__username': 'owner',
+}
+HEADER = [*EXPORT_COLUMNS.values(), 'tags']
+
+FORMATS = {
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    صفوف التصدير كقواميس بذاكرة ثابتة.
+
+    نقرأ القيم بـ iterator دون إنشاء كائنات النموذج، ولكل دفعة نجلب الوسوم
+    باستعلام واحد بدل استعلام لكل كتاب.
+    """
+    rows = queryset.order_by('id').values(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        tags = tags_for([row['id'] for row in chunk])
+        for row in chunk:
+            out = {column: row[field] for field, column in EXPORT_COLUMNS.items()}
+            out['tags'] = sorted(tags.get(row['id'], []))
+            yield out
+
+
+def id_ranges(queryset):
+    """
+    كتب الاستعلام كنطاقات [أول معرف، آخر معرف] متتالية في جدول الكتب، فلا يقع
+    بين طرفي النطاق كتاب غير محدد. التحديد كله أو تصفية متقاربة تصبح بضعة نطاقات
+    بدل عشرات آلاف المعرفات في رسالة المهمة.
+    """
+    selected = set(queryset.values_list('id', flat=True))
+    ranges = []
+    run = None
+    for book_id in Book.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        if book_id not in selected:
+            run = None
+        elif run is None:
+            run = [book_id, book_id]
+            ranges.append(run)
+        else:
+            run[1] = book_id
+    return ranges
+
+
+def iter_rows_for_ranges(ranges, chunk_size=EXPORT_CHUNK_SIZE):
+    """مثل iter_rows لنطاقات id_ranges()، بعدد محدود من النطاقات في كل استعلام."""
+    for start in range(0, len(ranges), RANGES_PER_QUERY):
+        condition = Q()
+        for first, last in ranges[start:start + RANGES_PER_QUERY]:
+            condition |= Q(id__range=(first, last))
+        yield from iter_rows(Book.objects.filter(condition), chunk_size)
+
+
+def _dumps(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def iter_json(rows):
+    yield '['
+    for index, row in enumerate(rows):
+        yield ('\n' if index == 0 else ',\n') + _dumps(row)
+    yield '\n]\n'
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield _dumps(row) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        row['tags'] = '|'.join(row['tags'])
+        yield writer.writerow([row[column] for column in HEADER])
+
+
+WRITERS = {
+    'json': iter_json,
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+
+def export_filename(fmt):
+    return f"books.{FORMATS[fmt][1]}"
+
+
+def streaming_export(queryset, fmt):
+    content_type, _ext = FORMATS[fmt]
+    response = StreamingHttpResponse(WRITERS[fmt](iter_rows(queryset)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename={export_filename(fmt)}'
+    return response
+
+
+def new_export_filename(user_id, fmt):
+    """اسم ملف تصدير الخلفية: يحمل معرف صاحبه، وجزء عشوائي يمنع التصادم."""
+    return f"books-{user_id}-{timezone.now():%Y%m%d-%H%M%S}-{secrets.token_hex(4)}.{FORMATS[fmt][1]}"
+
+
+_EXPORT_NAME = re.compile(r'^books-(?P<user_id>\d+)-\d{8}-\d{6}-[0-9a-f]{8}\.(?:json|ndjson|csv)$')
+
+
+def export_owner(filename):
+    """معرف صاحب ملف التصدير، أو None إن لم يكن الاسم من new_export_filename."""
+    match = _EXPORT_NAME.match(filename)
+    return int(match['user_id']) if match else None
+
+
+def export_path(filename):
+    return os.path.join(EXPORT_ROOT, filename)
+
+
+def prune_exports(max_age=EXPORT_MAX_AGE):
+    """يحذف ملفات التصدير الأقدم من max_age ثانية، ويرجع عددها."""
+    if not os.path.isdir(EXPORT_ROOT):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(EXPORT_ROOT):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def export_to_file(rows, fmt, filename):
+    """يكتب التصدير إلى EXPORT_ROOT بعد حذف الملفات المنتهية، ويعيد مساره."""
+    prune_exports()
+    path = export_path(filename)
+    os.makedirs(EXPORT_ROOT, exist_ok=True)
+    with open(f'{path}.tmp', 'w', encoding='utf-8', newline='') as output:
+        for part in WRITERS[fmt](rows):
+            output.write(part)
+    os.replace(f'{path}.tmp', path)
+    return path
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils import translation
+from django.utils.safestring import mark_safe
+from .caching import CacheNamespace
+from . import images
+
+CARD_TEMPLATES = {
+    'index': 'parts/index_book_card.html',
+    'books': 'parts/book_card.html',
+}
+CARD_CACHE_TIMEOUT = getattr(settings, 'LMS_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+# الإصدار يزيد عند تعديل التصنيفات أو الدورات، لأن البطاقة تعرض بيانات منها
+cards = CacheNamespace('cards', timeout=CARD_CACHE_TIMEOUT)
+
+
+def bump_card_generation():
+    cards.bump()
+
+
+def card_version(updated_at):
+    return int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+
+
+def card_key(layout, book_id, updated_at, language):
+    return _key(layout, book_id, card_version(updated_at), language)
+
+
+def _key(layout, book_id, version, language):
+    return f'{layout}:{book_id}:{version}:{language}'
+
+
+def _cacheable(book):
+    # لا نخزّن بطاقة بصورة أصلية ريثما تُولّد النسخ المصغرة، وإلا بقيت كذلك حتى يتعدل الكتاب
+    return all(images.is_ready(photo.name) for photo in (book.photo_book, book.photo_author) if photo)
+
+
+def render_cards(books, layout='books'):
+    """
+    بطاقات الكتب كـ HTML جاهز: ما في الكاش يُستخدم كما هو، والباقي يُرسم ويُخزّن.
+
+    المفتاح يتضمن معرف الكتاب ووقت تعديله واللغة، فأي حفظ للكتاب
+    يولّد مفتاحاً جديداً دون الحاجة لمسح شيء.
+    """
+    language = translation.get_language()
+    generation = cards.version()
+    keys = [card_key(layout, book.id, book.updated_at, language) for book in books]
+    cached = cards.get_many(keys, version=generation)
+    template = None
+    rendered = {}
+    parts = []
+    for book, key in zip(books, keys):
+        html = cached.get(key)
+        if html is None:
+            template = template or get_template(CARD_TEMPLATES[layout])
+            html = template.render({'book': book})
+            if _cacheable(book):
+                rendered[key] = html
+        parts.append(html)
+    if rendered:
+        cards.set_many(rendered, version=generation)
+    return mark_safe(''.join(parts))
+
+
+def stale_card(book):
+    """معرف الكتاب وإصدار بطاقته قبل هذا الحفظ، أو None لكتاب جديد."""
+    updated_at = book.initial_value('updated_at')
+    if updated_at is None:
+        return None
+    return [book.id or book.initial_value('id'), card_version(updated_at)]
+
+
+def invalidate_cards(entries):
+    """يمسح بطاقات الإصدارات السابقة ([معرف، إصدار]) بكل اللغات حتى لا تبقى في الكاش بلا فائدة."""
+    keys = [
+        _key(layout, book_id, version, language)
+        for book_id, version in entries
+        for layout in CARD_TEMPLATES
+        for language, _name in settings.LANGUAGES
+    ]
+    if keys:
+        cards.delete_many(keys)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('lms.images')
+
+THUMB_SUBDIR = 'thumbs'
+THUMB_WIDTHS = getattr(settings, 'LMS_THUMB_WIDTHS', (160, 320, 640))
+THUMB_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'progressive': True, 'optimize': True},
+}
+THUMB_WORKERS = getattr(settings, 'LMS_THUMB_WORKERS', 4)
+INFO_CACHE_TIMEOUT = None
+
+
+def _name_hash(name):
+    return hashlib.md5(name.encode()).hexdigest()
+
+
+def _info_key(name):
+    return f"lms:thumbs:{_name_hash(name)}"
+
+
+def _info_path(name):
+    # الوصف ملف JSON بجانب النسخ نفسها، فيراه كل من يرى MEDIA_ROOT (الويب والعامل)،
+    # والكاش فوقه لتجنب قراءة الملف في كل عرض
+    return os.path.join(settings.MEDIA_ROOT, THUMB_SUBDIR, 'info', f"{_name_hash(name)}.json")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def derivative_name(digest, width, fmt):
+    return f"{THUMB_SUBDIR}/{digest[:2]}/{digest[:32]}-{width}.{fmt}"
+
+
+def generate_derivatives(name):
+    """
+    يولّد نسخاً مصغرة بعدة عروض وصيغتين لصورة واحدة ويكتب وصفها في ملف.
+
+    أسماء الملفات مبنية على بصمة المحتوى، فالصورة نفسها المرفوعة مرتين
+    تُعالج مرة واحدة والنسخ الموجودة تُتخطى.
+    """
+    source_path = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.exists(source_path):
+        return None
+    # PIL يُحمَّل عند أول معالجة فقط، فالعروض والقوالب التي تقرأ الوصف من الكاش لا تحتاجه
+    from PIL import Image, ImageOps
+    digest = file_digest(source_path)
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    widths = [width for width in THUMB_WIDTHS if width < image.width] or [min(THUMB_WIDTHS)]
+    for width in widths:
+        resized = None
+        for fmt, options in THUMB_FORMATS.items():
+            path = os.path.join(settings.MEDIA_ROOT, derivative_name(digest, width, fmt))
+            if os.path.exists(path):
+                continue
+            if resized is None:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            resized.save(f'{path}.tmp', **options)
+            os.replace(f'{path}.tmp', path)
+    info = {'digest': digest, 'widths': widths}
+    info_path = _info_path(name)
+    os.makedirs(os.path.dirname(info_path), exist_ok=True)
+    with open(f'{info_path}.tmp', 'w') as target:
+        json.dump(info, target)
+    os.replace(f'{info_path}.tmp', info_path)
+    cache.set(_info_key(name), info, INFO_CACHE_TIMEOUT)
+    return info
+
+
+def _generate_safely(name):
+    # UnidentifiedImageError وأخطاء قراءة الملف من OSError، والبيانات التالفة قد ترفع ValueError
+    try:
+        return generate_derivatives(name)
+    except (OSError, ValueError):
+        logger.warning("تعذر توليد النسخ المصغرة للصورة %s", name, exc_info=True)
+        return None
+
+
+def generate_many(names, workers=THUMB_WORKERS):
+    """النسخ لعدة صور؛ الصورة التالفة أو المفقودة تُسجّل وقيمتها None، ويكمل الباقي."""
+    # Pillow يحرر الـ GIL أثناء فك الترميز والتصغير، فالخيوط كافية هنا
+    names = [name for name in set(names) if name]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names) or 1))) as pool:
+        return dict(zip(names, pool.map(_generate_safely, names)))
+
+
+def schedule(names):
+    """
+    يرسل الصور التي لم تُعالج بعد إلى مهمة الخلفية. يُستدعى من حفظ الكتاب فقط؛
+    إن تعذر الوصول للوسيط تبقى الصور الأصلية معروضة حتى generate_thumbnails.
+    """
+    from .tasks import generate_image_derivatives_task
+    names = [name for name in set(names) if name and not is_ready(name)]
+    if not names:
+        return
+    try:
+        generate_image_derivatives_task.delay(names)
+    except Exception:
+        logger.warning("تعذرت جدولة النسخ المصغرة لـ %d صورة", len(names), exc_info=True)
+
+
+def get_info(name):
+    """وصف النسخ المصغرة، أو None إن لم تُولّد بعد (دون جدولة شيء)."""
+    if not name:
+        return None
+    key = _info_key(name)
+    info = cache.get(key)
+    if info is None:
+        try:
+            with open(_info_path(name)) as source:
+                info = json.load(source)
+        except (OSError, ValueError):
+            return None
+        cache.set(key, info, INFO_CACHE_TIMEOUT)
+    return info
+
+
+def is_ready(name):
+    """هل وُلّدت النسخ المصغرة للصورة؟"""
+    return get_info(name) is not None
+
+
+def _url(info, width, fmt):
+    return f"{settings.MEDIA_URL}{derivative_name(info['digest'], width, fmt)}"
+
+
+def srcset_for(info, fmt='jpeg'):
+    return ', '.join(f"{_url(info, width, fmt)} {width}w" for width in info['widths'])
+
+
+def url_for(info, width, fmt='jpeg'):
+    """أصغر نسخة لا يقل عرضها عن width."""
+    best = next((w for w in info['widths'] if w >= width), info['widths'][-1])
+    return _url(info, best, fmt)
+
+
+def thumbnail_url(field_file, width, fmt='jpeg'):
+    """رابط النسخة المصغرة المناسبة، أو الصورة الأصلية إن لم تتوفر نسخ بعد."""
+    if not field_file:
+        return ''
+    info = get_info(field_file.name)
+    return url_for(info, width, fmt) if info else field_file.url
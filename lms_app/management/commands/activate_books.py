@@ -1,15 +1,52 @@
 from django.core.management.base import BaseCommand
-from lms_app.models import Book
+from lms_app.models import Book, BulkProgress
+from lms_app import bulk
+
 
 class Command(BaseCommand):
-    help = 'تفعيل جميع الكتب غير المفعلة'
+    help = 'تفعيل الكتب غير المفعلة على دفعات قابلة للاستئناف'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, help='معرف التصنيف')
+        parser.add_argument('--course', type=int, help='معرف الدورة')
+        parser.add_argument('--chunk-size', type=int, default=bulk.BULK_CHUNK_SIZE,
+                            help=f'عدد الكتب في كل معاملة (افتراضياً {bulk.BULK_CHUNK_SIZE})')
+        parser.add_argument('--pause', type=float, default=bulk.BULK_PAUSE_SECONDS,
+                            help='ثوانٍ بين الدفعات ليأخذ الكتّاب الآخرون دورهم')
+        parser.add_argument('--dry-run', action='store_true', help='عرض العدد دون تعديل')
+        parser.add_argument('--restart', action='store_true', help='تجاهل نقطة الاستئناف والبدء من الأول')
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
         books_to_activate = Book.objects.filter(active=False)
-        count = books_to_activate.count()
+        key = 'activate_books'
+        for field in ('category', 'course'):
+            if options[field] is not None:
+                books_to_activate = books_to_activate.filter(**{f'{field}_id': options[field]})
+                key += f':{field}={options[field]}'
+
+        checkpoint = BulkProgress.objects.filter(key=key, finished=False).first()
+        if checkpoint and not options['restart'] and not options['dry_run']:
+            self.stdout.write(f"استئناف من الكتاب #{checkpoint.last_id} ({checkpoint.processed} كتاب سابقاً).")
 
-        if count == 0:
+        result = bulk.update(
+            books_to_activate, {'active': True}, key=key,
+            chunk_size=options['chunk_size'], pause=options['pause'],
+            dry_run=options['dry_run'], restart=options['restart'], progress=self.report_progress,
+        )
+
+        if result.total == 0:
             self.stdout.write(self.style.WARNING("لا توجد كتب بحاجة للتفعيل."))
+        elif options['dry_run']:
+            chunks = -(-result.total // options['chunk_size'])
+            self.stdout.write(f"سيتم تفعيل {result.total} كتاب على {chunks} دفعة.")
         else:
-            books_to_activate.update(active=True)
-            self.stdout.write(self.style.SUCCESS(f"تم تفعيل {count} كتاب."))
+            self.stdout.write(self.style.SUCCESS(
+                f"تم تفعيل {result.processed} كتاب في {result.chunks} دفعة خلال {result.elapsed:.1f} ثانية "
+                f"({result.rate:.0f} كتاب/ثانية، أطول دفعة {result.slowest_chunk * 1000:.0f}ms)."
+            ))
+
+    def report_progress(self, result):
+        self.stdout.write(
+            f"  {result.processed}/{result.total} ({result.rate:.0f} كتاب/ثانية)",
+            ending='\r' if self.stdout.isatty() else '\n',
+        )
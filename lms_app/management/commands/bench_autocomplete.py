@@ -0,0 +1,45 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from lms_app.autocomplete import course_index
+from lms_app.models import Course
+
+
+def _percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return statistics.median(samples), cuts[98]
+
+
+class Command(BaseCommand):
+    help = 'قياس زمن الإكمال التلقائي للدورات: الفهرس في الذاكرة مقابل استعلام icontains'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        names = list(Course.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError("لا توجد دورات للقياس.")
+        rng = random.Random(options['seed'])
+        terms = []
+        for _ in range(options['iterations']):
+            name = rng.choice(names)
+            terms.append(name[:rng.randint(1, min(len(name), 4))])
+
+        course_index.warm()
+        paths = {
+            'index': lambda term: (course_index.current_generation(), course_index.lookup(term)),
+            'query': lambda term: list(
+                Course.objects.filter(name__icontains=term).values_list('name', flat=True)[:10]
+            ),
+        }
+        for label, lookup in paths.items():
+            samples = []
+            for term in terms:
+                start = time.perf_counter()
+                lookup(term)
+                samples.append((time.perf_counter() - start) * 1000)
+            p50, p99 = _percentiles(samples)
+            self.stdout.write(f"{label:6} p50={p50:.3f}ms p99={p99:.3f}ms ({len(samples)} طلب، {len(names)} دورة)")
@@ -0,0 +1,45 @@
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+from lms_app.models import Book
+from lms_app.pagination import CATALOGUE_PAGE_SIZE
+from lms_app import fragments
+
+
+class Command(BaseCommand):
+    help = 'قياس رسم بطاقات الكتب: دون كاش، وبكاش بارد، وبكاش دافئ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000)
+        parser.add_argument('--layout', choices=sorted(fragments.CARD_TEMPLATES), default='books')
+        parser.add_argument('--page-size', type=int, default=CATALOGUE_PAGE_SIZE)
+
+    def handle(self, *args, **options):
+        count, layout, size = options['count'], options['layout'], options['page_size']
+        books = list(Book.objects.select_related('category', 'course').order_by('-id')[:count])
+        if not books:
+            raise CommandError("لا توجد كتب للقياس.")
+        max_entries = getattr(cache, '_max_entries', None)
+        if max_entries is not None and max_entries < len(books):
+            self.stdout.write(self.style.WARNING(
+                f"الكاش يتسع لـ {max_entries} مدخل فقط، فالقياس الدافئ لن يجد كل البطاقات."
+            ))
+        pages = [books[start:start + size] for start in range(0, len(books), size)]
+
+        template = get_template(fragments.CARD_TEMPLATES[layout])
+        fragments.bump_card_generation()
+        runs = {
+            'uncached': lambda page: ''.join(template.render({'book': book}) for book in page),
+            'cold': lambda page: fragments.render_cards(page, layout),
+            'warm': lambda page: fragments.render_cards(page, layout),
+        }
+        for label, render in runs.items():
+            start = time.perf_counter()
+            for page in pages:
+                render(page)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(
+                f"{label:8} {elapsed:8.1f}ms إجمالاً، {elapsed / len(pages):.2f}ms للصفحة "
+                f"({len(books)} بطاقة، {len(pages)} صفحة)"
+            )
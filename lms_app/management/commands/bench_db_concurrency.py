@@ -0,0 +1,181 @@
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from lms_app.models import Book
+
+# الإعداد القديم: ملف بدفتر rollback وfsync كامل ومعاملات مؤجلة
+PROFILES = {
+    'baseline': {
+        'pragmas': ['PRAGMA journal_mode=DELETE', 'PRAGMA synchronous=FULL'],
+        'begin': 'BEGIN',
+    },
+    'tuned': {
+        'pragmas': getattr(settings, 'SQLITE_PRAGMAS', []),
+        'begin': 'BEGIN IMMEDIATE',
+    },
+}
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))], 3)
+
+
+class Command(BaseCommand):
+    help = (
+        'قياس إنتاجية القراءة والكتابة المتزامنة على SQLite: الإعداد القديم مقابل WAL والإعدادات الحالية. '
+        'يعمل على نسخة مؤقتة من قاعدة البيانات فلا يعدّل البيانات الحقيقية.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', dest='profiles', choices=sorted(PROFILES))
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows-per-write', type=int, default=20, help='عدد الكتب في كل معاملة كتابة')
+        parser.add_argument('--timeout', type=float, default=5, help='مهلة انتظار القفل لكل اتصال')
+        parser.add_argument('--output', help='ملف JSON لحفظ النتائج')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("هذا القياس خاص بـ SQLite.")
+        self.ids = list(Book.objects.values_list('id', flat=True))
+        if not self.ids:
+            raise CommandError("لا توجد كتب، استخدم seed_benchmark_data أولاً.")
+
+        results = {}
+        for name in options['profiles'] or ['baseline', 'tuned']:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.copy_database(path)
+                results[name] = self.run_profile(path, PROFILES[name], options)
+            self.report(name, results[name])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump({'options': {key: options[key] for key in ('readers', 'writers', 'seconds', 'rows_per_write')},
+                           'books': len(self.ids), 'results': results}, target, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"حُفظت النتائج في {options['output']}"))
+
+    def copy_database(self, path):
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def connect(self, path, profile, timeout):
+        # isolation_level=None: نتحكم بالمعاملات يدوياً مثل Django
+        db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for pragma in profile['pragmas']:
+            db.execute(pragma)
+        return db
+
+    def run_profile(self, path, profile, options):
+        table = Book._meta.db_table
+        # تحويل نمط الدفتر يُحفظ في الملف، نطبقه مرة قبل بدء العمال
+        self.connect(path, profile, options['timeout']).close()
+
+        start = time.perf_counter()
+        for _ in range(20):
+            self.connect(path, profile, options['timeout']).close()
+        connect_ms = (time.perf_counter() - start) / 20 * 1000
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {
+            'read': {'ops': 0, 'errors': 0, 'latencies': []},
+            'write': {'ops': 0, 'errors': 0, 'latencies': []},
+        }
+
+        def record(kind, elapsed, ok):
+            with lock:
+                entry = stats[kind]
+                if ok:
+                    entry['ops'] += 1
+                    entry['latencies'].append(elapsed * 1000)
+                else:
+                    entry['errors'] += 1
+
+        def reader(seed):
+            rng = random.Random(seed)
+            db = self.connect(path, profile, options['timeout'])
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    # صفحة كتالوج بالمؤشر كما في keyset_page
+                    db.execute(
+                        f"SELECT id, title, price, status FROM {table} "
+                        f"WHERE active = 1 AND id < ? ORDER BY id DESC LIMIT 20",
+                        [rng.choice(self.ids)],
+                    ).fetchall()
+                    ok = True
+                except sqlite3.OperationalError:
+                    ok = False
+                record('read', time.perf_counter() - started, ok)
+            db.close()
+
+        def writer(seed):
+            rng = random.Random(seed)
+            db = self.connect(path, profile, options['timeout'])
+            while not stop.is_set():
+                ids = rng.sample(self.ids, min(options['rows_per_write'], len(self.ids)))
+                started = time.perf_counter()
+                try:
+                    # كما يفعل عامل PDF أو الحفظ من الإدارة: تحديث صفوف ثم commit
+                    db.execute(profile['begin'])
+                    db.executemany(
+                        f"UPDATE {table} SET updated_at = ? WHERE id = ?",
+                        [(timezone.now().isoformat(), book_id) for book_id in ids],
+                    )
+                    db.execute('COMMIT')
+                    ok = True
+                except sqlite3.OperationalError:
+                    if db.in_transaction:
+                        db.execute('ROLLBACK')
+                    ok = False
+                record('write', time.perf_counter() - started, ok)
+            db.close()
+
+        threads = [threading.Thread(target=reader, args=(index,)) for index in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(1000 + index,)) for index in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        result = {'connect_ms': round(connect_ms, 3)}
+        for kind, entry in stats.items():
+            latencies = entry['latencies']
+            result[kind] = {
+                'ops': entry['ops'],
+                'per_second': round(entry['ops'] / options['seconds'], 1),
+                'errors': entry['errors'],
+                'p50_ms': _percentile(latencies, 50),
+                'p99_ms': _percentile(latencies, 99),
+                'mean_ms': round(statistics.fmean(latencies), 3) if latencies else None,
+            }
+        return result
+
+    def report(self, name, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}: فتح اتصال {result['connect_ms']:.2f}ms"))
+        for kind in ('read', 'write'):
+            entry = result[kind]
+            self.stdout.write(
+                f"  {kind:6} {entry['per_second']:9.1f}/ثانية  p50={entry['p50_ms']}ms  "
+                f"p99={entry['p99_ms']}ms  أخطاء القفل={entry['errors']}"
+            )
@@ -0,0 +1,113 @@
+import json
+import statistics
+import time
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from taggit.models import TaggedItem
+from lms_app.models import Book, TaggedBook
+from lms_app import tags
+
+
+class Rollback(Exception):
+    pass
+
+
+def _timed(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = (
+        'مقارنة استعلامات الوسوم: جدول TaggedBook المفهرس مقابل TaggedItem العام. '
+        'تُنسخ الوسوم إلى الجدول العام داخل معاملة يُتراجع عنها في النهاية.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=100, help='عدد الكتب في قياس وسوم صفحة')
+        parser.add_argument('--output', help='ملف JSON لحفظ النتائج')
+
+    def handle(self, *args, **options):
+        cloud = tags.cloud(limit=50)
+        if len(cloud) < 2:
+            raise CommandError("لا توجد وسوم كافية، استخدم seed_benchmark_data أولاً.")
+        self.popular = [cloud[0][0], cloud[1][0]]
+        self.rare = [cloud[-1][0]]
+        self.page_ids = list(Book.objects.order_by('-id').values_list('id', flat=True)[:options['page_size']])
+        self.content_type = ContentType.objects.get_for_model(Book)
+
+        try:
+            with transaction.atomic():
+                TaggedItem.objects.bulk_create(
+                    [
+                        TaggedItem(content_type=self.content_type, object_id=book_id, tag_id=tag_id)
+                        for book_id, tag_id in TaggedBook.objects.values_list('content_object_id', 'tag_id').iterator()
+                    ],
+                    batch_size=2000, ignore_conflicts=True,
+                )
+                results = self.measure(options['iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"== {TaggedBook.objects.count()} ربط وسم، {len(cloud)}+ وسم (الوسيط بالملي ثانية)"
+        ))
+        for name, (generic, indexed) in results.items():
+            self.stdout.write(f"  {name:24} عام={generic:8.2f}  مفهرس={indexed:8.2f}  ×{generic / indexed if indexed else 0:.1f}")
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump({name: {'generic_ms': generic, 'indexed_ms': indexed}
+                           for name, (generic, indexed) in results.items()}, target, indent=2)
+
+    def generic_items(self, names):
+        return TaggedItem.objects.filter(content_type=self.content_type, tag__name__in=names)
+
+    def generic_any(self, names):
+        return Book.objects.filter(id__in=self.generic_items(names).values('object_id'))
+
+    def generic_all(self, names):
+        matching = (
+            self.generic_items(names).values('object_id')
+            .annotate(matched=Count('tag_id')).filter(matched=len(names)).values('object_id')
+        )
+        return Book.objects.filter(id__in=matching)
+
+    def generic_cloud(self):
+        return list(
+            TaggedItem.objects.filter(content_type=self.content_type)
+            .values('tag__name').annotate(count=Count('id')).order_by('-count')[:50]
+        )
+
+    def generic_page(self):
+        result = {}
+        items = TaggedItem.objects.filter(content_type=self.content_type, object_id__in=self.page_ids)
+        for object_id, name in items.values_list('object_id', 'tag__name'):
+            result.setdefault(object_id, []).append(name)
+        return result
+
+    def measure(self, iterations):
+        books = Book.objects.all()
+        scenarios = {
+            'any (popular)': (lambda: self.generic_any(self.popular).count(),
+                              lambda: tags.with_any(books, self.popular).count()),
+            'all (popular)': (lambda: self.generic_all(self.popular).count(),
+                              lambda: tags.with_all(books, self.popular).count()),
+            'all (rare+popular) page': (lambda: list(self.generic_all(self.rare + self.popular[:1]).order_by('-id')[:20]),
+                                        lambda: list(tags.with_all(books, self.rare + self.popular[:1]).order_by('-id')[:20])),
+            'any (rare) page': (lambda: list(self.generic_any(self.rare).order_by('-id')[:20]),
+                                lambda: list(tags.with_any(books, self.rare).order_by('-id')[:20])),
+            'cloud': (self.generic_cloud, lambda: tags._cloud(None, 50)),
+            'tags for page': (self.generic_page, lambda: tags.tags_for(self.page_ids)),
+        }
+        return {
+            name: (_timed(generic, iterations), _timed(indexed, iterations))
+            for name, (generic, indexed) in scenarios.items()
+        }
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from lms_app import events
+from lms_app.models import BookEvent
+
+
+class Command(BaseCommand):
+    help = 'توزيع سجلات تغييرات الكتب المعلقة على المستهلكين (مرة، أو باستمرار مع --interval)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='ثوانٍ بين كل تصريف؛ بدونها يصرّف مرة ويخرج')
+        parser.add_argument('--batch-size', type=int, default=events.DRAIN_BATCH_SIZE)
+        parser.add_argument('--retry-dead', action='store_true',
+                            help='إعادة السجلات التي تجاوزت حد المحاولات إلى التصريف')
+
+    def handle(self, *args, **options):
+        if options['retry_dead']:
+            self.stdout.write(f"أُعيد {events.retry_dead()} سجل متروك إلى التصريف.")
+        while True:
+            start = time.perf_counter()
+            drained = events.drain(limit=options['batch_size'])
+            if drained or options['interval'] is None:
+                self.stdout.write(
+                    f"تم توزيع {drained} سجل في {(time.perf_counter() - start) * 1000:.0f}ms، "
+                    f"المتبقي {BookEvent.objects.filter(dead=False).count()}."
+                )
+                dead = BookEvent.objects.filter(dead=True).count()
+                if dead:
+                    self.stdout.write(self.style.WARNING(
+                        f"{dead} سجل تجاوز حد المحاولات، راجع السجل ثم أعده بـ --retry-dead."
+                    ))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
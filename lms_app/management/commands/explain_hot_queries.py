@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from lms_app.models import Book
+from lms_app.pagination import keyset_page
+from lms_app.stats import compute_book_stats
+from lms_app import search
+
+CHANGELIST_ORDERING = ['-active', 'category', '-id']
+
+
+def hot_queries():
+    """المسارات الساخنة المعروفة: الاسم والدالة التي تنفّذ استعلاماتها."""
+    return [
+        ('dashboard stats', compute_book_stats),
+        ('catalogue page', lambda: keyset_page(Book.objects.select_related('category', 'course'))),
+        ('search', lambda: search.ranked_ids('a', 0, 25) if search.is_available() else None),
+        ('admin changelist', lambda: list(
+            Book.objects.select_related('category', 'course').order_by(*CHANGELIST_ORDERING)[:100]
+        )),
+        ('price filter', lambda: list(
+            Book.objects.filter(price__isnull=False, price__gt=150).order_by(*CHANGELIST_ORDERING)[:100]
+        )),
+        ('date hierarchy', lambda: list(Book.objects.dates('published_date', 'year'))),
+        ('api status filter', lambda: list(Book.objects.filter(status='sold', active=True).order_by('-id')[:50])),
+        ('activate_books', lambda: Book.objects.filter(active=False).count()),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'طباعة خطط تنفيذ الاستعلامات الساخنة لكشف أي تراجع في استخدام الفهارس'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='أسماء الاستعلامات المطلوبة فقط')
+
+    def handle(self, *args, **options):
+        explain = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        # فحص توفر FTS يُخزّن بعد أول استدعاء، فلا يظهر استعلامه ضمن خطة البحث
+        search.is_available()
+        for name, run in hot_queries():
+            if options['names'] and name not in options['names']:
+                continue
+            with CaptureQueriesContext(connection) as captured:
+                run()
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name} ({len(captured)} استعلام)"))
+            for query in captured.captured_queries:
+                self.stdout.write(query['sql'])
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{explain} {query['sql']}")
+                    for row in cursor.fetchall():
+                        line = '  ' + ' '.join(str(column) for column in row)
+                        # مسح كامل للجدول دون فهرس علامة على تراجع
+                        full_scan = 'SCAN' in line and 'USING' not in line and 'lms_app_book_fts' not in line
+                        self.stdout.write(self.style.WARNING(line) if full_scan else line)
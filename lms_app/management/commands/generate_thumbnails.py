@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from lms_app.models import Book
+from lms_app import images
+
+
+class Command(BaseCommand):
+    help = 'توليد النسخ المصغرة الناقصة لصور الكتب في هذه العملية، دون وسيط Celery'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=images.THUMB_WORKERS)
+
+    def handle(self, *args, **options):
+        names = set()
+        for photo_book, photo_author in Book.objects.values_list('photo_book', 'photo_author').iterator():
+            names.update(name for name in (photo_book, photo_author) if name)
+        missing = [name for name in names if not images.is_ready(name)]
+        results = images.generate_many(missing, workers=options['workers'])
+        generated = sum(1 for info in results.values() if info)
+        self.stdout.write(self.style.SUCCESS(
+            f"تم توليد النسخ المصغرة لـ {generated} صورة من {len(missing)} ناقصة ({len(names)} إجمالاً)."
+        ))
+        if generated < len(missing):
+            self.stdout.write(self.style.WARNING(f"{len(missing) - generated} صورة مفقودة أو تالفة، التفاصيل في السجل."))
@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from lms_app.benchmarks import startup
+
+
+class Command(BaseCommand):
+    help = (
+        'قياس الإقلاع البارد لنقاط الدخول (الويب، عامل Celery، أوامر الإدارة) '
+        'في عمليات جديدة مع -X importtime، وأثقل الحزم في كل منها.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry', action='append', dest='entries', choices=sorted(startup.ENTRY_POINTS),
+                            help='نقطة دخول محددة، يمكن تكرارها (افتراضياً الكل)')
+        parser.add_argument('--env', action='append', dest='environments', choices=['development', 'production'],
+                            help='قيمة LMS_ENV للعمليات المقاسة، يمكن تكرارها للمقارنة (افتراضياً البيئة الحالية)')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--top', type=int, default=8, help='عدد الحزم الأثقل المعروضة')
+        parser.add_argument('--output', help='ملف JSON لحفظ النتائج')
+
+    def handle(self, *args, **options):
+        meta = startup.metadata()
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== الإقلاع البارد، {meta['settings']}، الإيداع {meta['commit']}"))
+        try:
+            results = startup.run(
+                entries=options['entries'], environments=options['environments'] or (None,),
+                runs=options['runs'], warmup=options['warmup'], top=options['top'], log=self.stdout.write,
+            )
+        except RuntimeError as exc:
+            raise CommandError(exc)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump({'meta': meta, 'results': results}, target, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"حُفظت النتائج في {options['output']}"))
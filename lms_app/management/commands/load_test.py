@@ -0,0 +1,137 @@
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/ar/',
+    '/ar/books/',
+    '/ar/api/books/',
+    '/ar/api/books/stats/',
+    '/ar/course-autocomplete/?term=a',
+]
+
+# الخادم المطلوب لكل مسار: ASGI مع العروض غير المتزامنة، وWSGI مع المتزامنة
+SERVERS = {
+    'asgi': ('uvicorn', ['uvicorn', 'lms.asgi:application', '--host', '127.0.0.1', '--port', '{port}',
+                         '--workers', '{workers}', '--no-access-log', '--log-level', 'warning']),
+    'wsgi': ('gunicorn', ['gunicorn', 'lms.wsgi:application', '--bind', '127.0.0.1:{port}',
+                          '--workers', '{workers}', '--threads', '{threads}', '--log-level', 'warning']),
+}
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        'اختبار حمل لعروض القراءة ومقارنة الإنتاجية بين ASGI وWSGI. '
+        'إما على خوادم تعمل مسبقاً (--target asgi=http://127.0.0.1:8001) '
+        'أو بتشغيلها تلقائياً (--serve asgi --serve wsgi، يتطلب uvicorn وgunicorn).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', default=[], metavar='LABEL=URL')
+        parser.add_argument('--serve', action='append', default=[], choices=sorted(SERVERS))
+        parser.add_argument('--path', action='append', dest='paths', help='المسارات المطلوبة (افتراضياً عروض القراءة)')
+        parser.add_argument('--requests', type=int, default=2000, help='عدد الطلبات لكل هدف')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--workers', type=int, default=1, help='عدد عمليات الخادم مع --serve')
+        parser.add_argument('--threads', type=int, default=8, help='خيوط كل عملية WSGI مع --serve')
+        parser.add_argument('--port', type=int, default=8701, help='أول منفذ للخوادم المُشغّلة')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        targets = []
+        for target in options['target']:
+            label, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f"صيغة الهدف LABEL=URL: {target}")
+            targets.append((label, url.rstrip('/')))
+
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING(
+                "DEBUG مفعل في الإعدادات: شريط التصحيح وتسجيل الاستعلامات سيهيمنان على النتائج."
+            ))
+        processes = []
+        try:
+            for offset, name in enumerate(options['serve']):
+                port = options['port'] + offset
+                processes.append(self.start_server(name, port, options))
+                targets.append((name, f'http://127.0.0.1:{port}'))
+            if not targets:
+                raise CommandError("حدد --target أو --serve.")
+            for label, url in targets:
+                self.run_target(label, url, paths, options['requests'], options['concurrency'])
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=10)
+
+    def start_server(self, name, port, options):
+        executable, command = SERVERS[name]
+        if shutil.which(executable) is None:
+            raise CommandError(f"{executable} غير مثبت: pip install {executable}")
+        command = [part.format(port=port, workers=options['workers'], threads=options['threads']) for part in command]
+        process = subprocess.Popen(command, env=os.environ.copy())
+        if not _wait_for_port(port):
+            process.terminate()
+            raise CommandError(f"لم يبدأ خادم {name} على المنفذ {port}.")
+        return process
+
+    def run_target(self, label, base_url, paths, total, concurrency):
+        parts = urlsplit(base_url)
+        local = threading.local()
+
+        def fetch(index):
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = local.connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            path = paths[index % len(paths)]
+            start = time.perf_counter()
+            try:
+                connection.request('GET', f"{parts.path}{path}")
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                local.connection = None
+                ok = False
+            return path, (time.perf_counter() - start) * 1000, ok
+
+        # طلب تمهيدي لكل مسار حتى لا يُحسب تحميل الكود والكاش البارد
+        with ThreadPoolExecutor(max_workers=1) as warmup:
+            list(warmup.map(fetch, range(len(paths))))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+
+        errors = sum(1 for _path, _ms, ok in results if not ok)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"== {label} ({base_url}): {total / elapsed:.0f} طلب/ثانية، {errors} خطأ، "
+            f"{concurrency} متزامن"
+        ))
+        for path in paths:
+            samples = [ms for result_path, ms, _ok in results if result_path == path]
+            if len(samples) < 2:
+                continue
+            p99 = statistics.quantiles(samples, n=100)[98]
+            self.stdout.write(f"  {path:40} p50={statistics.median(samples):7.1f}ms p99={p99:7.1f}ms")
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from lms_app import profiling
+
+COLUMNS = ('duration_ms', 'queries', 'db_ms', 'render_ms', 'size_bytes')
+
+
+def _percentile(histogram, bounds, fraction):
+    """تقدير من المدرج: الحد الأعلى للخانة التي يقع فيها الترتيب المطلوب."""
+    target = sum(histogram) * fraction
+    cumulative = 0
+    for bound, count in zip(list(bounds) + [float('inf')], histogram):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return float('inf')
+
+
+class Command(BaseCommand):
+    help = 'تقرير القياسات المجمعة من ProfilingMiddleware: لكل عرض المتوسط وp95، وأنماط N+1'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=COLUMNS + ('requests',), default='duration_ms')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--reset', action='store_true', help='مسح القياسات بعد عرضها')
+
+    def handle(self, *args, **options):
+        views, nplusone = profiling.snapshot()
+        if not views:
+            self.stdout.write(self.style.WARNING("لا توجد قياسات بعد."))
+            return
+
+        def sort_key(item):
+            _name, data = item
+            if options['sort'] == 'requests':
+                return data['requests']
+            return data['sums'][options['sort']] / data['requests']
+
+        header = f"{'view':40} {'requests':>8}" + ''.join(f" {column + ' avg/p95':>22}" for column in COLUMNS)
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        for name, data in sorted(views.items(), key=sort_key, reverse=True)[:options['limit']]:
+            cells = []
+            for column in COLUMNS:
+                average = data['sums'][column] / data['requests']
+                p95 = _percentile(data['histograms'][column], profiling.BUCKETS[column], 0.95)
+                cells.append(f" {average:>12.1f} / ≤{p95:<7g}")
+            self.stdout.write(f"{name[:40]:40} {data['requests']:>8}" + ''.join(cells))
+
+        if nplusone:
+            self.stdout.write(self.style.MIGRATE_HEADING("\nأنماط N+1 (نفس الاستعلام متكرر في طلب واحد):"))
+            for (name, sql), entry in sorted(nplusone.items(), key=lambda item: -item[1]['requests']):
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: {entry['requests']} طلب، حتى {entry['max_repeats']} تكرار\n    {sql[:300]}"
+                ))
+
+        if options['reset']:
+            profiling.reset()
+            self.stdout.write("تم مسح القياسات.")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from lms_app.models import Book, BookCounter
+from lms_app.caching import bump_catalogue_version
+from lms_app import counters
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء عدادات الكتب لكل تصنيف ودورة وحالة من جدول الكتب'
+
+    def handle(self, *args, **kwargs):
+        drifted = counters.rebuild(Book, BookCounter)
+        bump_catalogue_version()
+        if drifted:
+            self.stdout.write(self.style.WARNING(f"تم تصحيح {drifted} عداد مختلف عن جدول الكتب."))
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة بناء {BookCounter.objects.count()} عداد."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from lms_app.models import Book
+from lms_app import search
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء فهرس البحث النصي للكتب'
+
+    def handle(self, *args, **kwargs):
+        if not search.is_available():
+            raise CommandError("فهرس البحث غير متوفر، شغّل migrate أولاً (يتطلب SQLite مع FTS5).")
+        search.rebuild_index(Book)
+        self.stdout.write(self.style.SUCCESS(f"تمت فهرسة {Book.objects.count()} كتاب."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from lms_app.models import Book
+from lms_app.caching import bump_catalogue_version
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب إجمالي التأجير لكل الكتب بتحديث جماعي، أو فحص الصفوف المنحرفة فقط'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='عرض الصفوف المنحرفة دون تعديلها')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='عدد المعرفات في كل معاملة (0 لتحديث واحد)')
+        parser.add_argument('--show', type=int, default=20, help='عدد الصفوف المنحرفة المعروضة')
+
+    def handle(self, *args, **options):
+        drift = Book.objects.total_retal_drift()
+        drifted = drift.count()
+        if options['check']:
+            for book in drift.order_by('id').values('id', 'retal_price_day', 'retal_period', 'total_retal', 'expected_total_retal')[:options['show']]:
+                self.stdout.write(
+                    f"#{book['id']}: {book['retal_price_day']} × {book['retal_period']} = "
+                    f"{book['expected_total_retal']}، المخزن {book['total_retal']}"
+                )
+            if drifted:
+                raise CommandError(f"{drifted} كتاب إجمالي التأجير فيه لا يطابق السعر اليومي × الفترة.")
+            self.stdout.write(self.style.SUCCESS("كل قيم إجمالي التأجير متسقة."))
+            return
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("كل قيم إجمالي التأجير متسقة، لا حاجة للتحديث."))
+            return
+        updated = Book.objects.recompute_total_retal(chunk_size=options['chunk_size'])
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة حساب {updated} كتاب ({drifted} منها كانت منحرفة)."))
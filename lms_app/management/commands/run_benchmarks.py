@@ -0,0 +1,55 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from lms_app.benchmarks import scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        'قياس زمن المسارات الساخنة (لوحة التحكم، البحث، الـ API، الإحصائيات، التصدير، صفحة الإدارة) '
+        'بكاش بارد ودافئ، مع حفظ النتائج JSON للمقارنة بين الإيداعات.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='names',
+                            help='سيناريو محدد، يمكن تكراره (افتراضياً الكل)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--mode', action='append', dest='modes', choices=['cold', 'warm'])
+        parser.add_argument('--output', help='ملف JSON لحفظ النتائج')
+        parser.add_argument('--compare', help='ملف JSON من تشغيل سابق للمقارنة معه')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as exc:
+                raise CommandError(exc)
+
+        meta = scenarios.metadata()
+        if meta['debug']:
+            self.stdout.write(self.style.WARNING("DEBUG مفعل: النتائج لا تمثل الإنتاج."))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"== {meta['books']} كتاب، {meta['database']}، الإيداع {meta['commit']}"
+        ))
+        try:
+            results = scenarios.run(
+                names=options['names'], iterations=options['iterations'], warmup=options['warmup'],
+                modes=options['modes'] or ('cold', 'warm'), log=self.stdout.write,
+            )
+        except scenarios.ScenarioFailed as exc:
+            raise CommandError(f"فشل السيناريو {exc}")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump({'meta': meta, 'results': results}, target, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"حُفظت النتائج في {options['output']}"))
+
+        if baseline:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"== مقارنة مع الإيداع {baseline['meta'].get('commit')}"
+            ))
+            for name, change in scenarios.compare(baseline['results'], results).items():
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(f"  {name:28} {change:+7.1f}%"))
@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import translation
+from lms_app.autocomplete import course_index
+from lms_app.checks import uses_locmem_cache
+from lms_app.fragments import CARD_TEMPLATES, render_cards
+from lms_app.pagination import keyset_page
+from lms_app.stats import get_book_stats
+from lms_app.views import _catalogue_queryset
+
+
+class Command(BaseCommand):
+    help = 'تجهيز الكاش بعد النشر: صفحات الكتالوج الأولى والعدادات وفهرس الدورات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3, help='عدد صفحات الكتالوج لكل تخطيط ولغة')
+
+    def handle(self, *args, **options):
+        if uses_locmem_cache():
+            self.stdout.write(self.style.WARNING(
+                'الكاش locmem خاص بهذه العملية، فلن يصل التجهيز إلى عمليات الويب. استخدم LMS_CACHE_BACKEND=file أو redis.'
+            ))
+        self.step('عدادات لوحة التحكم', get_book_stats)
+        self.step('فهرس الدورات', course_index.warm)
+        self.step('بطاقات الكتالوج', lambda: self.warm_cards(options['pages']))
+
+    def step(self, label, warm):
+        start = time.perf_counter()
+        result = warm()
+        detail = f" ({result})" if isinstance(result, int) else ''
+        self.stdout.write(self.style.SUCCESS(f"{label}{detail}: {(time.perf_counter() - start) * 1000:.0f}ms"))
+
+    def warm_cards(self, pages):
+        count = 0
+        books = []
+        cursor = None
+        for _ in range(pages):
+            page, cursor = keyset_page(_catalogue_queryset(), cursor)
+            books.extend(page)
+            if cursor is None:
+                break
+        for language, _name in settings.LANGUAGES:
+            with translation.override(language):
+                for layout in CARD_TEMPLATES:
+                    render_cards(books, layout)
+                    count += len(books)
+        return count
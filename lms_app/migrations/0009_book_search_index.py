@@ -0,0 +1,71 @@
+import re
+from django.db import migrations
+
+# نسخة مجمّدة من الفهرسة كما كانت عند هذا الترحيل، حتى لا يتغير ما يفعله
+# الترحيل مع أي تعديل لاحق على lms_app.search
+FTS_TABLE = 'lms_app_book_fts'
+_ARABIC_MARKS = re.compile('[\u0640\u064B-\u0652\u0670]')
+_ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+})
+_TOKEN = re.compile(r'\w+')
+_ARTICLE = 'ال'
+
+
+def _strip_article(token):
+    if token.startswith(_ARTICLE) and len(token) > len(_ARTICLE) + 2:
+        return token[len(_ARTICLE):]
+    return token
+
+
+def _index_text(text):
+    if not text:
+        return ''
+    text = _ARABIC_MARKS.sub('', str(text).lower()).translate(_ARABIC_LETTERS)
+    tokens = _TOKEN.findall(text)
+    extra = [_strip_article(token) for token in tokens if _strip_article(token) != token]
+    return ' '.join(tokens + extra)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(title, author, course, tokenize='unicode61 remove_diacritics 2')"
+    )
+    Book = apps.get_model('lms_app', 'Book')
+    rows = (
+        (book_id, _index_text(title), _index_text(author), _index_text(course_name))
+        for book_id, title, author, course_name in Book.objects.using(schema_editor.connection.alias)
+        .values_list('id', 'title', 'author', 'course__name').iterator(chunk_size=2000)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, author, course) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0008_book_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
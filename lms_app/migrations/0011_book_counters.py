@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+KEY_FIELDS = ('category_id', 'course_id', 'status', 'active')
+
+
+def populate_counters(apps, schema_editor):
+    # التجميع منسوخ هنا بدل استدعاء lms_app.counters، فلا يتغير الترحيل مع تغيّر الوحدة
+    Book = apps.get_model('lms_app', 'Book')
+    BookCounter = apps.get_model('lms_app', 'BookCounter')
+    alias = schema_editor.connection.alias
+    groups = Book.objects.using(alias).order_by().values(*KEY_FIELDS).annotate(
+        group_count=models.Count('id'), group_priced=models.Count('price'), group_price_total=models.Sum('price'),
+    )
+    BookCounter.objects.using(alias).all().delete()
+    BookCounter.objects.using(alias).bulk_create([
+        BookCounter(
+            **{field: group[field] for field in KEY_FIELDS},
+            count=group['group_count'], priced=group['group_priced'], price_total=group['group_price_total'] or 0,
+        )
+        for group in groups
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0010_book_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=50, null=True)),
+                ('active', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+                ('priced', models.IntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='lms_app.category')),
+                ('course', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='lms_app.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'course', 'status', 'active'], name='book_counter_key_idx')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0013_book_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('processed', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2 on 2026-10-18 09:40
+
+import django.db.models.deletion
+import taggit.managers
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def _book_content_type(apps):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    return ContentType.objects.filter(app_label='lms_app', model='book').first()
+
+
+def copy_to_tagged_book(apps, schema_editor):
+    content_type = _book_content_type(apps)
+    if content_type is None:
+        return
+    Book = apps.get_model('lms_app', 'Book')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TaggedBook = apps.get_model('lms_app', 'TaggedBook')
+    # TaggedItem بلا مفتاح أجنبي، فقد يشير إلى كتب محذوفة
+    items = TaggedItem.objects.filter(content_type=content_type, object_id__in=Book.objects.values('id'))
+    rows = items.values_list('object_id', 'tag_id').order_by('id').iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    for book_id, tag_id in rows:
+        batch.append(TaggedBook(content_object_id=book_id, tag_id=tag_id))
+        if len(batch) >= BATCH_SIZE:
+            TaggedBook.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TaggedBook.objects.bulk_create(batch, ignore_conflicts=True)
+    TaggedItem.objects.filter(content_type=content_type).delete()
+
+
+def copy_to_tagged_item(apps, schema_editor):
+    content_type = _book_content_type(apps)
+    if content_type is None:
+        return
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TaggedBook = apps.get_model('lms_app', 'TaggedBook')
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(content_type=content_type, object_id=book_id, tag_id=tag_id)
+            for book_id, tag_id in TaggedBook.objects.values_list('content_object_id', 'tag_id').iterator()
+        ],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0014_bulk_progress'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaggedBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_object', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tagged_items', to='lms_app.book')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='taggedbook',
+            index=models.Index(fields=['tag', 'content_object'], name='tagged_book_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taggedbook',
+            constraint=models.UniqueConstraint(fields=('content_object', 'tag'), name='tagged_book_unique'),
+        ),
+        migrations.RunPython(copy_to_tagged_book, copy_to_tagged_item),
+        migrations.AlterField(
+            model_name='book',
+            name='tags',
+            field=taggit.managers.TaggableManager(help_text='A comma-separated list of tags.', through='lms_app.TaggedBook', to='taggit.Tag', verbose_name='Tags'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 10:02
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+KEY_FIELDS = ('category_id', 'course_id', 'status', 'active')
+
+
+def merge_duplicate_counters(apps, schema_editor):
+    # التحديثات المتزامنة قبل القيد قد تكون أنشأت صفين للمفتاح نفسه، فنجمعهما في صف واحد
+    BookCounter = apps.get_model('lms_app', 'BookCounter')
+    counters = BookCounter.objects.using(schema_editor.connection.alias)
+    duplicates = counters.order_by().values(*KEY_FIELDS).annotate(
+        rows=models.Count('id'), total_count=models.Sum('count'), total_priced=models.Sum('priced'),
+        total_price=models.Sum('price_total'), keep=models.Min('id'),
+    ).filter(rows__gt=1)
+    for group in duplicates:
+        # filter(field=None) لا يطابق NULL، فنستعمل isnull للمفاتيح الفارغة
+        key = {
+            (f'{field}__isnull' if group[field] is None else field): (True if group[field] is None else group[field])
+            for field in KEY_FIELDS
+        }
+        counters.filter(**key).exclude(id=group['keep']).delete()
+        counters.filter(id=group['keep']).update(
+            count=group['total_count'], priced=group['total_priced'], price_total=group['total_price'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0015_tagged_book'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_counters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bookcounter',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('category', 0, output_field=models.BigIntegerField()), django.db.models.functions.comparison.Coalesce('course', 0, output_field=models.BigIntegerField()), django.db.models.functions.comparison.Coalesce('status', models.Value('')), models.F('active'), name='book_counter_key_unique'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+def skip_to_delivered(apps, schema_editor):
+    # السجلات المعلقة من قبل الترحيل: المستهلكون المتخطَّون صاروا في delivered
+    BookEvent = apps.get_model('lms_app', 'BookEvent')
+    events = list(BookEvent.objects.using(schema_editor.connection.alias).filter(data__has_key='skip'))
+    for event in events:
+        event.delivered = sorted(event.data.pop('skip'))
+    BookEvent.objects.using(schema_editor.connection.alias).bulk_update(events, ['data', 'delivered'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms_app', '0016_book_counter_unique_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bookevent',
+            name='dead',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='bookevent',
+            name='delivered',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='bookevent',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(skip_to_delivered, migrations.RunPython.noop),
+    ]
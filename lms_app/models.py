@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Round
 from taggit.managers import TaggableManager
+from taggit.models import TaggedItemBase
 from django.utils.translation import gettext_lazy as _
-from django_lifecycle import LifecycleModel, hook, AFTER_CREATE, AFTER_UPDATE, BEFORE_SAVE
+from django_lifecycle import LifecycleModel, hook, AFTER_CREATE, AFTER_UPDATE, BEFORE_SAVE, BEFORE_DELETE
 from django.contrib.auth import get_user_model
 from .fields import LowercaseCharField
 
@@ -21,6 +24,49 @@ class Course(models.Model):
         return self.name
 
 
+# شرط التأجير كما في calculate_total_retal: سعر يومي وفترة غير فارغين ولا صفريين
+RENTAL_PRICED = (
+    models.Q(retal_price_day__isnull=False, retal_period__isnull=False)
+    & ~models.Q(retal_price_day=0) & ~models.Q(retal_period=0)
+)
+
+
+def expected_total_retal():
+    # التقريب لخانتين يطابق الحساب بـ Decimal في Python، ويمنع فروق الأعداد العشرية في SQLite
+    return Round(models.F('retal_price_day') * models.F('retal_period'), 2)
+
+
+class BookQuerySet(models.QuerySet):
+    def with_expected_total_retal(self):
+        return self.annotate(expected_total_retal=expected_total_retal())
+
+    def total_retal_drift(self):
+        """الكتب المؤجرة التي لا يساوي total_retal فيها السعر اليومي × الفترة."""
+        return self.filter(RENTAL_PRICED).with_expected_total_retal().filter(
+            models.Q(total_retal__isnull=True) | ~models.Q(total_retal=models.F('expected_total_retal'))
+        )
+
+    def recompute_total_retal(self, chunk_size=None):
+        """
+        يعيد حساب total_retal بـ UPDATE واحد على مستوى قاعدة البيانات.
+
+        مع chunk_size يُقسم العمل إلى نطاقات id متتالية، كل نطاق في معاملة
+        مستقلة، حتى لا يُقفل الجدول طوال تحديث ملايين الصفوف.
+        """
+        rentals = self.filter(RENTAL_PRICED)
+        total = expected_total_retal()
+        if not chunk_size:
+            return rentals.update(total_retal=total)
+        bounds = rentals.aggregate(first=models.Min('id'), last=models.Max('id'))
+        if bounds['first'] is None:
+            return 0
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+            with transaction.atomic():
+                updated += rentals.filter(id__gte=start, id__lt=start + chunk_size).update(total_retal=total)
+        return updated
+
+
 class Book(LifecycleModel): 
     STATUS_CHOICES = [
         ('availble', 'availble'),
@@ -41,14 +87,35 @@ class Book(LifecycleModel):
     active = models.BooleanField(default=False)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, null=True, blank=True)
-    tags = TaggableManager()
+    tags = TaggableManager(through='TaggedBook')
     published_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookQuerySet.as_manager()
     status_color = models.CharField(max_length=7, blank=True, help_text="اختر لون الحالة")
     owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='books', null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # ترتيب قائمة الكتب في لوحة الإدارة
+            models.Index(fields=['-active', 'category', '-id'], name='book_changelist_idx'),
+            # عدادات لوحة التحكم وفلتر الحالة، ومعها السعر ليكون التجميع من الفهرس وحده
+            models.Index(fields=['status', 'active', 'price'], name='book_status_active_idx'),
+            models.Index(fields=['price'], name='book_price_idx', condition=models.Q(price__isnull=False)),
+            models.Index(fields=['published_date'], name='book_published_idx', condition=models.Q(published_date__isnull=False)),
+            # أحدث الكتب المفعلة، وغير المفعلة لأمر activate_books
+            models.Index(fields=['-id'], name='book_active_recent_idx', condition=models.Q(active=True)),
+            models.Index(fields=['id'], name='book_inactive_idx', condition=models.Q(active=False)),
+        ]
+
     def __str__(self):
         return self.title
 
+    def refresh_from_db(self, *args, **kwargs):
+        # lifecycle يعيد الحالة الأولية من القاعدة، فآخر حالة احتسبتها العدادات لم تعد صالحة (مثلاً بعد تراجع)
+        self.__dict__.pop('_counter_state', None)
+        super().refresh_from_db(*args, **kwargs)
+
     
     @hook(BEFORE_SAVE)
     def calculate_total_retal(self):
@@ -56,21 +123,111 @@ class Book(LifecycleModel):
             self.total_retal = self.retal_price_day * self.retal_period
 
     @hook(AFTER_CREATE)
-    def trigger_pdf_generation(self):
-        print(f"✅ تم إنشاء الكتاب: {self.title}")
-        from .tasks import generate_books_pdf_task 
-        generate_books_pdf_task.delay([self.id])  
+    def publish_created(self):
+        from . import events
+        events.book_saved(self, created=True)
 
+    @hook(AFTER_UPDATE)
+    def publish_updated(self):
+        from . import events
+        events.book_saved(self, created=False)
+
+    # قبل الحذف ما دام المعرف موجوداً؛ save وdelete في lifecycle داخل معاملة فيُلغى السجل إن فشل الحذف
+    @hook(BEFORE_DELETE)
+    def publish_deleted(self):
+        from . import events
+        events.book_deleted(self)
+
+    @hook(AFTER_CREATE)
+    @hook(AFTER_UPDATE, when_any=['photo_book', 'photo_author'], has_changed=True)
+    def generate_thumbnails(self):
+        from . import images
+        names = [self.photo_book.name, self.photo_author.name]
+        transaction.on_commit(lambda: images.schedule(names))
 
 
-    @hook(AFTER_UPDATE, when='active', has_changed=True)
-    def log_active_change(self):
-        if self.active:
-            print(f"📗 تم تفعيل الكتاب: {self.title}")
-        else:
-            print(f"📕 تم إلغاء تفعيل الكتاب: {self.title}")
+class TaggedBook(TaggedItemBase):
+    """
+    وسوم الكتب بجدول خاص بدل TaggedItem العام: مفتاح أجنبي مباشر بلا ربط
+    بنوع المحتوى، وفهرسان لاتجاهي البحث (وسوم كتاب، وكتب وسم).
+    """
+    content_object = models.ForeignKey('Book', on_delete=models.CASCADE, related_name='tagged_items')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_object', 'tag'], name='tagged_book_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'content_object'], name='tagged_book_tag_idx'),
+        ]
 
-    @hook(AFTER_UPDATE, when='status', has_changed=True)
-    def log_status_change(self):
-        print(f"🔄 تم تغيير حالة الكتاب '{self.title}' إلى: {self.status}")
+
+class BookCounter(models.Model):
+    """عدادات الكتب لكل تصنيف ودورة وحالة، تُحدَّث مع كل تعديل بدل العدّ من جدول الكتب."""
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, related_name='+')
+    status = models.CharField(max_length=50, null=True)
+    active = models.BooleanField()
+    count = models.IntegerField(default=0)
+    priced = models.IntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # أعمدة المفتاح تقبل NULL، وNULL لا يتكرر في القيد العادي، فنوحّده بـ COALESCE.
+            # counters.apply يعتمد على هذا القيد في INSERT ... ON CONFLICT
+            models.UniqueConstraint(
+                Coalesce('category', 0, output_field=models.BigIntegerField()),
+                Coalesce('course', 0, output_field=models.BigIntegerField()),
+                Coalesce('status', Value('')),
+                F('active'),
+                name='book_counter_key_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'course', 'status', 'active'], name='book_counter_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id}/{self.course_id}/{self.status}/{self.active}: {self.count}"
+
+
+class BookEvent(models.Model):
+    """
+    سجل تغييرات الكتب (outbox): يُكتب في معاملة التغيير نفسها، فيختفي مع التراجع،
+    ويُوزّع على المستهلكين (العدادات، البحث، الكاش، PDF) دفعة واحدة بعد الـ commit.
+    يُحذف السجل بعد أن يستلمه كل المستهلكين، وما فشل يُعاد لاحقاً حتى حد المحاولات.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    KIND_CHOICES = [(CREATED, CREATED), (UPDATED, UPDATED), (DELETED, DELETED)]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    book_ids = models.JSONField()
+    fields = models.JSONField(default=list)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # أسماء المستهلكين الذين استلموا السجل بنجاح
+    delivered = models.JSONField(default=list)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # لا يُصرّف قبل هذا الوقت: مهلة بعد فشل، أو حجز ريثما تعمل مستهلكات ما بعد الـ commit
+    retry_at = models.DateTimeField(null=True, blank=True)
+    # تجاوز حد المحاولات: يُترك جانباً حتى drain_book_events --retry-dead
+    dead = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.kind} {len(self.book_ids)}"
+
+
+class BulkProgress(models.Model):
+    """نقطة استئناف عملية جماعية مقسّمة (آخر معرف عولج)، تُحفظ مع كل دفعة في نفس المعاملة."""
+    key = models.CharField(max_length=200, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.key}: {self.processed} (#{self.last_id})"
@@ -0,0 +1,45 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+CATALOGUE_PAGE_SIZE = getattr(settings, 'LMS_CATALOGUE_PAGE_SIZE', 24)
+
+
+def parse_cursor(value):
+    """يحوّل قيمة المؤشر القادمة من الرابط إلى رقم، أو None إذا كانت غير صالحة."""
+    try:
+        cursor = int(value)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+
+def keyset_page(queryset, cursor=None, size=CATALOGUE_PAGE_SIZE):
+    """
+    صفحة من الكتب مرتبة حسب -id تبدأ بعد المؤشر.
+
+    نجلب size + 1 صفاً لنعرف إن كانت هناك صفحة تالية دون COUNT،
+    فتبقى كلفة الصفحة ثابتة مهما كبر الجدول.
+    """
+    queryset = queryset.order_by('-id')
+    if cursor:
+        queryset = queryset.filter(id__lt=cursor)
+    items = list(queryset[:size + 1])
+    next_cursor = items[size - 1].id if len(items) > size else None
+    return items[:size], next_cursor
+
+
+async def akeyset_page(queryset, cursor=None, size=CATALOGUE_PAGE_SIZE):
+    """نسخة async من keyset_page للعروض غير المتزامنة."""
+    queryset = queryset.order_by('-id')
+    if cursor:
+        queryset = queryset.filter(id__lt=cursor)
+    items = [item async for item in queryset[:size + 1]]
+    next_cursor = items[size - 1].id if len(items) > size else None
+    return items[:size], next_cursor
+
+
+class BookCursorPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
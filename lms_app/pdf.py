@@ -0,0 +1,140 @@
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+
+logger = logging.getLogger('lms.pdf')
+
+PDF_SUBDIR = 'pdfs'
+PDF_CHUNK_SIZE = getattr(settings, 'LMS_PDF_CHUNK_SIZE', 50)
+PDF_WORKERS = getattr(settings, 'LMS_PDF_WORKERS', os.cpu_count() or 1)
+PDF_DEBOUNCE_SECONDS = getattr(settings, 'LMS_PDF_DEBOUNCE_SECONDS', 2)
+# أقصى عدد كتب في مهمة Celery واحدة، حتى تتوزع الدفعات الكبيرة على العمال
+PDF_TASK_SIZE = getattr(settings, 'LMS_PDF_TASK_SIZE', 1000)
+
+PAGE_SIZE = (827, 1169)  # A4 بدقة 100 نقطة في البوصة
+MARGIN = 60
+
+
+def book_payload(book):
+    """بيانات الكتاب كقاموس بسيط يمكن إرساله إلى عملية أخرى دون ORM."""
+    return {
+        'id': book.id,
+        'title': book.title,
+        'author': book.author or '',
+        'category': str(book.category) if book.category_id else '',
+        'course': str(book.course) if book.course_id else '',
+        'pages': book.pages,
+        'price': str(book.price) if book.price is not None else '',
+        'status': book.status or '',
+        'published_date': book.published_date.isoformat() if book.published_date else '',
+        'photo': book.photo_book.path if book.photo_book else '',
+    }
+
+
+def content_hash(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def pdf_path(book_id, digest):
+    return os.path.join(settings.MEDIA_ROOT, PDF_SUBDIR, f'book_{book_id}_{digest}.pdf')
+
+
+def render_book_pdf(payload, path):
+    from PIL import Image, ImageDraw, ImageFont
+    page = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+    y = MARGIN
+    if payload['photo'] and os.path.exists(payload['photo']):
+        with Image.open(payload['photo']) as cover:
+            cover = cover.convert('RGB')
+            cover.thumbnail((PAGE_SIZE[0] - 2 * MARGIN, 450))
+            page.paste(cover, (MARGIN, y))
+            y += cover.height + 30
+
+    title_font = ImageFont.load_default(size=32)
+    body_font = ImageFont.load_default(size=20)
+    draw.text((MARGIN, y), payload['title'], font=title_font, fill='black')
+    y += 60
+    for label, key in (('Author', 'author'), ('Category', 'category'), ('Course', 'course'),
+                       ('Pages', 'pages'), ('Price', 'price'), ('Status', 'status'),
+                       ('Published', 'published_date')):
+        if payload[key]:
+            draw.text((MARGIN, y), f"{label}: {payload[key]}", font=body_font, fill='black')
+            y += 32
+
+    # نكتب في ملف مؤقت ثم نستبدله حتى لا يُقرأ ملف ناقص
+    tmp_path = f'{path}.tmp'
+    page.save(tmp_path, 'PDF', resolution=100)
+    os.replace(tmp_path, path)
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f"book_{payload['id']}_*.pdf")):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+def render_chunk(jobs):
+    return [render_book_pdf(payload, path) for payload, path in jobs]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def generate_pdfs(book_ids, chunk_size=PDF_CHUNK_SIZE, workers=PDF_WORKERS):
+    """
+    يولّد ملفات PDF لمجموعة كتب باستعلام واحد.
+
+    الكتب التي لم يتغير محتواها منذ آخر توليد (نفس البصمة) تُتخطى،
+    والبقية تُقسم إلى دفعات وتُرسم بالتوازي في عمليات منفصلة.
+    """
+    # الاستيراد هنا لأن العمليات الفرعية تستورد هذه الوحدة للرسم فقط دون تهيئة Django
+    from .models import Book
+    books = Book.objects.select_related('category', 'course').in_bulk(book_ids)
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, PDF_SUBDIR), exist_ok=True)
+
+    jobs = []
+    for book in books.values():
+        payload = book_payload(book)
+        path = pdf_path(book.id, content_hash(payload))
+        if not os.path.exists(path):
+            jobs.append((payload, path))
+
+    chunks = list(_chunks(jobs, chunk_size))
+    # عمال Celery من نوع prefork عمليات daemon لا يُسمح لها بإنشاء عمليات فرعية
+    if workers > 1 and len(chunks) > 1 and not multiprocessing.current_process().daemon:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            list(pool.map(render_chunk, chunks))
+    else:
+        for chunk in chunks:
+            render_chunk(chunk)
+
+    return {
+        'rendered': len(jobs),
+        'skipped': len(books) - len(jobs),
+        'missing': len(set(book_ids)) - len(books),
+    }
+
+
+def schedule(book_ids):
+    """
+    يرسل توليد PDF لكتب جديدة إلى Celery بمهام من PDF_TASK_SIZE كتاب، كل منها بعد
+    PDF_DEBOUNCE_SECONDS حتى تستقر التعديلات المتتالية. لا شيء يبقى في ذاكرة العملية:
+    يُستدعى من مستهلك outbox، وفشل أي دفعة يرفع خطأ فيبقى السجل لإعادة المحاولة
+    (المهمة تتخطى ما وُلّد بالمحتوى نفسه، فإعادة الدفعات الناجحة لا تكلف شيئاً).
+    """
+    from .tasks import generate_books_pdf_task
+    book_ids = sorted(book_ids)
+    for start in range(0, len(book_ids), PDF_TASK_SIZE):
+        chunk = book_ids[start:start + PDF_TASK_SIZE]
+        try:
+            generate_books_pdf_task.apply_async((chunk,), countdown=PDF_DEBOUNCE_SECONDS)
+        except Exception:
+            # الوسيط المتوقف يُفشل الدفعات التالية أيضاً بعد انتظار، فنتوقف عند أول فشل
+            logger.warning("تعذرت جدولة PDF لـ %d كتاب", len(book_ids) - start, exc_info=True)
+            raise
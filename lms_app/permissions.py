@@ -0,0 +1,94 @@
+import hashlib
+from django.core.cache import cache
+from guardian.core import ObjectPermissionChecker
+
+PERMS_CACHE_TIMEOUT = 60
+
+
+def _checker(request):
+    checker = getattr(request, '_lms_perm_checker', None)
+    if checker is None:
+        checker = request._lms_perm_checker = ObjectPermissionChecker(request.user)
+    return checker
+
+
+def _local(request):
+    local = getattr(request, '_lms_perms', None)
+    if local is None:
+        local = request._lms_perms = {}
+    return local
+
+
+def _version_key(user):
+    return f'lms:perms-version:{user.pk}'
+
+
+def _user_prefix(request):
+    prefix = getattr(request, '_lms_perm_prefix', None)
+    if prefix is None:
+        version = cache.get_or_set(_version_key(request.user), 1, None)
+        prefix = request._lms_perm_prefix = f'lms:perms:{request.user.pk}:{version}'
+    return prefix
+
+
+def _object_key(request, obj):
+    return f'{_user_prefix(request)}:{obj._meta.label_lower}:{obj.pk}'
+
+
+def prefetch_object_perms(request, objects):
+    """
+    يجلب صلاحيات المستخدم لكل كائنات الصفحة مرة واحدة.
+
+    نبحث أولاً في ذاكرة الطلب ثم في الكاش المشترك (عمر قصير)، وما تبقى
+    يُجلب من guardian باستعلام للمستخدم وآخر للمجموعات بدل استعلامين لكل صف.
+    """
+    local = _local(request)
+    pending = {}
+    for obj in objects:
+        key = _object_key(request, obj)
+        if key not in local:
+            pending[key] = obj
+    if not pending:
+        return
+    cached = cache.get_many(list(pending))
+    local.update(cached)
+    missing = [obj for key, obj in pending.items() if key not in cached]
+    if not missing:
+        return
+    checker = _checker(request)
+    checker.prefetch_perms(missing)
+    fetched = {_object_key(request, obj): frozenset(checker.get_perms(obj)) for obj in missing}
+    local.update(fetched)
+    cache.set_many(fetched, PERMS_CACHE_TIMEOUT)
+
+
+def get_object_perms(request, obj):
+    key = _object_key(request, obj)
+    local = _local(request)
+    if key not in local:
+        prefetch_object_perms(request, [obj])
+    return local[key]
+
+
+def in_group(request, name):
+    key = f'{_user_prefix(request)}:group:{hashlib.md5(name.encode()).hexdigest()}'
+    local = _local(request)
+    if key not in local:
+        member = cache.get(key)
+        if member is None:
+            member = request.user.groups.filter(name=name).exists()
+            cache.set(key, member, PERMS_CACHE_TIMEOUT)
+        local[key] = member
+    return local[key]
+
+
+def invalidate_user_perms(request, user):
+    """يُستدعى بعد assign_perm: رقم إصدار جديد يُبطل كل مفاتيح المستخدم دفعة واحدة."""
+    cache.add(_version_key(user), 1, None)
+    try:
+        cache.incr(_version_key(user))
+    except ValueError:
+        pass
+    if user.pk == request.user.pk:
+        for attr in ('_lms_perms', '_lms_perm_prefix', '_lms_perm_checker'):
+            request.__dict__.pop(attr, None)
@@ -0,0 +1,320 @@
+"""
+قياس خفيف للطلبات في الإنتاج: عدد الاستعلامات وزمنها، زمن رسم القوالب، حجم الاستجابة.
+
+كل عملية تجمع المدرجات التكرارية في الذاكرة، وتدمجها في الكاش المشترك كل
+بضع ثوانٍ، فيقرأ /metrics والأمر profile_report مجموع كل العمليات.
+الاستعلام نفسه المتكرر أكثر من حد معين في طلب واحد يُسجّل كنمط N+1.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends import django as django_backend
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('lms.profiling')
+
+PROFILING_ENABLED = getattr(settings, 'LMS_PROFILING', True)
+SAMPLE_RATE = getattr(settings, 'LMS_PROFILING_SAMPLE_RATE', 1.0)
+NPLUSONE_THRESHOLD = getattr(settings, 'LMS_PROFILING_NPLUSONE_THRESHOLD', 5)
+FLUSH_SECONDS = getattr(settings, 'LMS_PROFILING_FLUSH_SECONDS', 10)
+METRICS_TOKEN = getattr(settings, 'LMS_METRICS_TOKEN', None)
+EXCLUDED_PATHS = ('/metrics', '/static/', '/media/', '/__debug__/')
+
+METRICS_KEY = 'lms:metrics:views'
+NPLUSONE_KEY = 'lms:metrics:nplusone'
+LOCK_KEY = 'lms:metrics:lock'
+
+# حدود الخانات العليا لكل مقياس، والخانة الأخيرة لما فوقها
+BUCKETS = {
+    'duration_ms': (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'queries': (1, 2, 5, 10, 20, 50, 100, 200),
+    'db_ms': (1, 5, 10, 25, 50, 100, 250, 500, 1000),
+    'render_ms': (1, 5, 10, 25, 50, 100, 250, 500, 1000),
+    'size_bytes': (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000),
+}
+
+_current = ContextVar('lms_profile', default=None)
+
+
+class Profile:
+    """قياسات طلب (أو مهمة) واحد."""
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_depth = 0
+        self.statements = {}
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def repeated(self):
+        return {sql: count for sql, count in self.statements.items() if count >= NPLUSONE_THRESHOLD}
+
+
+class Registry:
+    """مدرجات هذه العملية منذ آخر دمج في الكاش."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._nplusone = {}
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def empty_view():
+        return {
+            'requests': 0,
+            'sums': {metric: 0.0 for metric in BUCKETS},
+            'histograms': {metric: [0] * (len(bounds) + 1) for metric, bounds in BUCKETS.items()},
+        }
+
+    def record(self, profile, size):
+        values = {
+            'duration_ms': (time.perf_counter() - profile.start) * 1000,
+            'queries': profile.queries,
+            'db_ms': profile.db_seconds * 1000,
+            'render_ms': profile.render_seconds * 1000,
+            'size_bytes': size or 0,
+        }
+        repeated = profile.repeated()
+        with self._lock:
+            view = self._views.setdefault(profile.name, self.empty_view())
+            view['requests'] += 1
+            for metric, value in values.items():
+                view['sums'][metric] += value
+                view['histograms'][metric][bisect_left(BUCKETS[metric], value)] += 1
+            for sql, count in repeated.items():
+                entry = self._nplusone.setdefault((profile.name, sql), {'requests': 0, 'max_repeats': 0})
+                entry['requests'] += 1
+                entry['max_repeats'] = max(entry['max_repeats'], count)
+        for sql, count in repeated.items():
+            logger.warning("N+1 في %s: الاستعلام تكرر %d مرة: %s", profile.name, count, sql[:200])
+
+    def flush(self, force=False):
+        """يدمج القياسات المحلية في الكاش المشترك، مرة كل FLUSH_SECONDS على الأكثر."""
+        if not force and time.monotonic() - self._flushed_at < FLUSH_SECONDS:
+            return
+        # قفل قصير في الكاش حتى لا تكتب عمليتان المجموع في الوقت نفسه
+        if not cache.add(LOCK_KEY, 1, 5):
+            return
+        try:
+            with self._lock:
+                views, nplusone = self._views, self._nplusone
+                self._views, self._nplusone = {}, {}
+                self._flushed_at = time.monotonic()
+            if views or nplusone:
+                shared = cache.get_many([METRICS_KEY, NPLUSONE_KEY])
+                cache.set_many({
+                    METRICS_KEY: merge_views(shared.get(METRICS_KEY, {}), views),
+                    NPLUSONE_KEY: merge_nplusone(shared.get(NPLUSONE_KEY, {}), nplusone),
+                }, None)
+        finally:
+            cache.delete(LOCK_KEY)
+
+
+def merge_views(total, views):
+    for name, view in views.items():
+        target = total.setdefault(name, Registry.empty_view())
+        target['requests'] += view['requests']
+        for metric in BUCKETS:
+            target['sums'][metric] += view['sums'][metric]
+            target['histograms'][metric] = [a + b for a, b in zip(target['histograms'][metric], view['histograms'][metric])]
+    return total
+
+
+def merge_nplusone(total, nplusone):
+    for key, entry in nplusone.items():
+        target = total.setdefault(key, {'requests': 0, 'max_repeats': 0})
+        target['requests'] += entry['requests']
+        target['max_repeats'] = max(target['max_repeats'], entry['max_repeats'])
+    return total
+
+
+registry = Registry()
+
+
+def snapshot():
+    registry.flush(force=True)
+    return cache.get(METRICS_KEY, {}), cache.get(NPLUSONE_KEY, {})
+
+
+def reset():
+    cache.delete_many([METRICS_KEY, NPLUSONE_KEY])
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        # نص الاستعلام بلا قيم المعاملات، فتكرار نفس الشكل لصفوف مختلفة يُحسب معاً
+        profile.add_query(sql, time.perf_counter() - start)
+
+
+def _install_query_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render(self, *args, **kwargs)
+        # القوالب المتداخلة (بطاقات داخل صفحة) لا تُحسب مرتين
+        profile.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.render_depth -= 1
+            if profile.render_depth == 0:
+                profile.render_seconds += time.perf_counter() - start
+    wrapper.__wrapped__ = render
+    return wrapper
+
+
+def install():
+    """يُستدعى من AppConfig.ready: يربط تسجيل الاستعلامات ورسم القوالب."""
+    if not PROFILING_ENABLED:
+        return
+    connection_created.connect(_install_query_wrapper, dispatch_uid='lms-profiling-queries')
+    template = django_backend.Template
+    if not hasattr(template.render, '__wrapped__'):
+        template.render = _timed_render(template.render)
+
+
+def install_task_signals():
+    """يُستدعى من lms_app.celery عند إنشاء تطبيق Celery، فلا يُحمَّل Celery مع كل أمر وطلب."""
+    if not PROFILING_ENABLED:
+        return
+    from celery.signals import task_postrun, task_prerun
+    task_prerun.connect(_task_started, weak=False, dispatch_uid='lms-profiling-task-start')
+    task_postrun.connect(_task_finished, weak=False, dispatch_uid='lms-profiling-task-end')
+
+
+_task_tokens = {}
+
+
+def _task_started(task_id=None, task=None, **kwargs):
+    _task_tokens[task_id] = _current.set(Profile(f'task:{task.name}'))
+
+
+def _task_finished(task_id=None, **kwargs):
+    profile = _current.get()
+    token = _task_tokens.pop(task_id, None)
+    if token is not None:
+        _current.reset(token)
+    if profile is not None:
+        registry.record(profile, None)
+        registry.flush()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+def _response_size(response):
+    return None if response.streaming else len(response.content)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _should_profile(self, request):
+        if not PROFILING_ENABLED or request.path.startswith(EXCLUDED_PATHS):
+            return False
+        return SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE
+
+    def _finish(self, request, profile, response):
+        profile.name = _view_name(request)
+        registry.record(profile, _response_size(response))
+        registry.flush()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._should_profile(request):
+            return self.get_response(request)
+        profile = Profile('')
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, profile, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self._should_profile(request):
+            return await self.get_response(request)
+        profile = Profile('')
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, profile, response)
+        return response
+
+
+def _prometheus(views, nplusone):
+    lines = []
+    for metric, bounds in BUCKETS.items():
+        name = f'lms_view_{metric}'
+        lines.append(f'# TYPE {name} histogram')
+        for view, data in sorted(views.items()):
+            cumulative = 0
+            for bound, count in zip(list(bounds) + ['+Inf'], data['histograms'][metric]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{view="{view}"}} {data["sums"][metric]:.3f}')
+            lines.append(f'{name}_count{{view="{view}"}} {data["requests"]}')
+    lines.append('# TYPE lms_view_nplusone_requests counter')
+    for (view, sql), entry in sorted(nplusone.items()):
+        label = sql[:120].replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+        lines.append(f'lms_view_nplusone_requests{{view="{view}",sql="{label}"}} {entry["requests"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    المدرجات بصيغة Prometheus، بالتوكن LMS_METRICS_TOKEN أو للموظفين.
+
+    خلف وكيل عكسي تصل كل الطلبات من 127.0.0.1، فعناوين INTERNAL_IPS لا تكفي
+    إلا مع DEBUG.
+    """
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    allowed = (
+        (METRICS_TOKEN and constant_time_compare(token, METRICS_TOKEN))
+        or (hasattr(request, 'user') and request.user.is_staff)
+        or (settings.DEBUG and request.META.get('REMOTE_ADDR') in getattr(settings, 'INTERNAL_IPS', ()))
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(_prometheus(*snapshot()), content_type='text/plain; version=0.0.4')
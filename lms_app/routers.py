@@ -0,0 +1,64 @@
+"""
+توجيه قراءات العروض المعلّمة إلى نسخة القراءة 'replica' إن كانت معرّفة في DATABASES.
+
+الكتابة والهجرات دائماً على default. القراءة من النسخة قد تتأخر قليلاً عن آخر
+كتابة، لذلك نعلّم العروض التي تتحمل ذلك فقط (الكتالوج، الإحصائيات، الإكمال
+التلقائي)، وتبقى لوحة الإدارة والتعديل على القاعدة الرئيسية.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+
+_use_replica = ContextVar('lms_use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view):
+    """يعلّم العرض بأنه للقراءة فقط، فتذهب استعلاماته إلى النسخة (متزامن أو غير متزامن)."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            # sync_to_async ينسخ السياق، فتصل العلامة إلى استعلامات الخيط أيضاً
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # النسخة والرئيسية نفس البيانات
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,161 @@
+import re
+from itertools import islice
+from django.db import connection, connections, router, transaction
+from django.db.models.expressions import RawSQL
+from .models import Book
+
+FTS_TABLE = 'lms_app_book_fts'
+
+# تشكيل، تطويل، والألف الخنجرية
+_ARABIC_MARKS = re.compile('[\u0640\u064B-\u0652\u0670]')
+_ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+})
+_TOKEN = re.compile(r'\w+')
+_ARTICLE = 'ال'
+
+
+def normalize(text):
+    """توحيد النص قبل الفهرسة والبحث: حروف صغيرة، بدون تشكيل، وصيغة واحدة للألف والياء والتاء المربوطة."""
+    if not text:
+        return ''
+    text = _ARABIC_MARKS.sub('', str(text).lower())
+    return text.translate(_ARABIC_LETTERS)
+
+
+def _strip_article(token):
+    if token.startswith(_ARTICLE) and len(token) > len(_ARTICLE) + 2:
+        return token[len(_ARTICLE):]
+    return token
+
+
+def index_text(text):
+    """النص كما يُخزن في الفهرس: نضيف لكل كلمة معرّفة بـ(ال) صيغتها بدون أداة التعريف."""
+    tokens = _TOKEN.findall(normalize(text))
+    extra = [_strip_article(token) for token in tokens if _strip_article(token) != token]
+    return ' '.join(tokens + extra)
+
+
+def build_match_query(term):
+    """يحوّل نص المستخدم إلى تعبير MATCH: كل كلمة مطلوبة وتطابق كبادئة."""
+    tokens = _TOKEN.findall(normalize(term))
+    return ' '.join(f'"{_strip_article(token)}"*' for token in tokens)
+
+
+def is_available():
+    # النتيجة (بالإيجاب أو النفي) تُخزّن على الاتصال، فلا يُفحص sqlite_master مع كل كتابة
+    # على قاعدة بلا FTS5. reset_availability بعد migrate يعيد الفحص.
+    available = getattr(connection, 'lms_fts_available', None)
+    if available is None:
+        available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+        connection.lms_fts_available = available
+    return available
+
+
+def reset_availability(using='default'):
+    connections[using].lms_fts_available = None
+
+
+def _row(book_id, title, author, course_name):
+    return (book_id, index_text(title), index_text(author), index_text(course_name))
+
+
+def index_book(book):
+    if not is_available():
+        return
+    course_name = book.course.name if book.course_id else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, author, course) VALUES (%s, %s, %s, %s)",
+            _row(book.id, book.title, book.author, course_name),
+        )
+
+
+def remove_book(book_id):
+    remove_books([book_id])
+
+
+def remove_books(book_ids):
+    book_ids = list(book_ids)
+    if not book_ids or not is_available():
+        return
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", book_ids)
+
+
+def reindex_course(course):
+    """إعادة فهرسة اسم الدورة لكل كتبها بعد تعديل الاسم."""
+    if not is_available():
+        return
+    book_ids = list(course.book_set.values_list('id', flat=True))
+    if not book_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET course = %s WHERE rowid IN ({placeholders})",
+            [index_text(course.name), *book_ids],
+        )
+
+
+def index_books(queryset, chunk_size=500):
+    """فهرسة مجموعة كتب دفعة واحدة، للمسارات التي تتجاوز hooks مثل bulk_create."""
+    values = queryset.values_list('id', 'title', 'author', 'course__name').iterator(chunk_size=chunk_size)
+    # معاملة واحدة، وإلا يُثبّت SQLite كل صف على حدة. INSERT متعدد الصفوف لكل دفعة
+    # بدل executemany، الذي يفشل تحت تتبع الاستعلامات في شريط التصحيح
+    with transaction.atomic(), connection.cursor() as cursor:
+        while True:
+            rows = [_row(*row) for row in islice(values, chunk_size)]
+            if not rows:
+                return
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, author, course) VALUES {placeholders}",
+                [value for row in rows for value in row],
+            )
+
+
+def rebuild_index(book_model):
+    """يعيد بناء الفهرس بالكامل من جدول الكتب."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    index_books(book_model.objects.all())
+
+
+def matching_ids_sql(term):
+    """استعلام فرعي بمعرفات الكتب المطابقة، يصلح لـ id__in."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [build_match_query(term)])
+
+
+def ranked_ids(term, offset=0, limit=None, course=None):
+    """معرفات الكتب المطابقة مرتبة حسب bm25 (العنوان أهم من المؤلف ثم الدورة)، ولدورة واحدة إن حُددت."""
+    match = build_match_query(term)
+    if not match:
+        return []
+    params = [match]
+    course_filter = ''
+    if course:
+        course_filter = f"AND rowid IN (SELECT id FROM {Book._meta.db_table} WHERE course_id = %s) "
+        params.append(course)
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {course_filter}"
+        f"ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0) LIMIT %s OFFSET %s"
+    )
+    # استعلام خام فلا يمر بالموجّه تلقائياً، نختار القاعدة كما يختارها ORM لقراءة الكتب
+    with connections[router.db_for_read(Book)].cursor() as cursor:
+        cursor.execute(sql, [*params, -1 if limit is None else limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_books(queryset, term):
+    if not build_match_query(term):
+        return queryset.none()
+    return queryset.filter(id__in=matching_ids_sql(term))
@@ -1,8 +1,48 @@
 from rest_framework import serializers
+from taggit.serializers import TaggitSerializer, TagListSerializerField
 from .models import Book
+from . import images
 
-class BookSerializer(serializers.ModelSerializer):
+
+def requested_fields(request):
+    """الحقول المطلوبة في ?fields=id,title,... أو None لكل الحقول."""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+class SparseFieldsMixin:
+    """يحذف من المخرجات كل حقل لم يُطلب في ?fields= حتى لا يُحسب أصلاً."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class BookSerializer(SparseFieldsMixin, TaggitSerializer, serializers.ModelSerializer):
     category_name = serializers.StringRelatedField(source='category', read_only=True)
+    # قائمة أسماء تُقرأ من prefetch_related('tags') في BookViewSet، وتُكتب بعد حفظ الكتاب
+    tags = TagListSerializerField(required=False)
+    photo_book_srcset = serializers.SerializerMethodField()
+    photo_author_srcset = serializers.SerializerMethodField()
+
+    def _srcset(self, field_file):
+        info = images.get_info(field_file.name) if field_file else None
+        if info is None:
+            return None
+        return {fmt: images.srcset_for(info, fmt) for fmt in images.THUMB_FORMATS}
+
+    def get_photo_book_srcset(self, obj):
+        return self._srcset(obj.photo_book)
+
+    def get_photo_author_srcset(self, obj):
+        return self._srcset(obj.photo_author)
 
     class Meta:
         model = Book
@@ -0,0 +1,55 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .autocomplete import course_index
+from .caching import bump_catalogue_version
+from .fragments import bump_card_generation
+from .models import Category, Course, TaggedBook
+from . import search
+
+
+@receiver(post_save, sender=Course)
+def reindex_course_books(sender, instance, created, **kwargs):
+    if not created:
+        search.reindex_course(instance)
+
+
+# الفهرس المشترك والجيل الجديد يُنشران بعد الـ commit فقط: التراجع لا يترك دورة
+# غير موجودة في الكاش، ولا يعيد طلب آخر بناء الفهرس من بيانات لم تُلتزم بعد
+@receiver(post_save, sender=Course)
+def update_course_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(course_index.update, instance.id, instance.name), robust=True)
+
+
+@receiver(post_delete, sender=Course)
+def remove_from_course_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(course_index.remove, instance.id), robust=True)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def catalogue_changed(sender, **kwargs):
+    # كما في ناقل الأحداث: الإصدار يتغير بعد الـ commit، وإلا أعاد قارئ متزامن
+    # تخزين البيانات القديمة تحت الإصدار الجديد
+    transaction.on_commit(_bump_catalogue_and_cards, robust=True)
+
+
+def _bump_catalogue_and_cards():
+    bump_catalogue_version()
+    bump_card_generation()
+
+
+@receiver(m2m_changed, sender=TaggedBook)
+def book_tags_changed(sender, action, **kwargs):
+    # book.tags.add/remove لا تحفظ الكتاب، وسحابة الوسوم والواجهة البرمجية مخزنة حسب إصدار الكتالوج
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_catalogue_version, robust=True)
+
+
+@receiver(post_migrate)
+def recheck_search_index(sender, using, **kwargs):
+    # الترحيل قد ينشئ جدول FTS أو يحذفه بعد أن خُزّنت نتيجة الفحص على الاتصال
+    search.reset_availability(using)
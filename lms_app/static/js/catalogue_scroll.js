@@ -0,0 +1,43 @@
+// تمرير لا نهائي لبطاقات الكتب: عند ظهور العنصر الحارس نجلب الدفعة التالية فقط
+document.addEventListener('DOMContentLoaded', function () {
+  const sentinel = document.querySelector('.catalogue-sentinel');
+  if (!sentinel || !('IntersectionObserver' in window)) {
+    return;
+  }
+  const container = document.getElementById(sentinel.dataset.target);
+  let loading = false;
+
+  const observer = new IntersectionObserver(function (entries) {
+    if (!entries[0].isIntersecting || loading) {
+      return;
+    }
+    const url = sentinel.dataset.nextUrl;
+    if (!url) {
+      observer.disconnect();
+      sentinel.remove();
+      return;
+    }
+    loading = true;
+    fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then(function (response) {
+        sentinel.dataset.nextUrl = response.headers.get('X-Next-Url') || '';
+        return response.text();
+      })
+      .then(function (html) {
+        container.insertAdjacentHTML('beforeend', html);
+        if (!sentinel.dataset.nextUrl) {
+          observer.disconnect();
+          sentinel.remove();
+        } else {
+          // إعادة المراقبة حتى نجلب دفعة أخرى إذا بقي الحارس ظاهراً
+          observer.unobserve(sentinel);
+          observer.observe(sentinel);
+        }
+      })
+      .finally(function () {
+        loading = false;
+      });
+  }, { rootMargin: '400px' });
+
+  observer.observe(sentinel);
+});
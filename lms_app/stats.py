@@ -0,0 +1,23 @@
+from .caching import catalogue
+from . import counters
+
+STATS_CACHE_TIMEOUT = 60 * 10
+
+
+def compute_book_stats():
+    """كل عدادات لوحة التحكم والتقرير من جدول BookCounter، دون مسح جدول الكتب."""
+    return counters.totals()
+
+
+def get_book_stats():
+    # المفتاح مرتبط بإصدار الكتالوج، فأي تعديل يجعل اللقطة القديمة غير مستخدمة
+    return catalogue.get_or_set('book-stats', compute_book_stats, STATS_CACHE_TIMEOUT)
+
+
+async def aget_book_stats():
+    version = await catalogue.aversion()
+    stats = await catalogue.aget('book-stats', version=version)
+    if stats is None:
+        stats = await counters.atotals()
+        await catalogue.aset('book-stats', stats, STATS_CACHE_TIMEOUT, version=version)
+    return stats
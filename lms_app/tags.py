@@ -0,0 +1,113 @@
+"""
+استعلامات الوسوم على جدول TaggedBook: الكتب التي تحمل كل الوسوم أو أحدها،
+وعدد الكتب لكل وسم (سحابة الوسوم)، ووسوم مجموعة كتب دفعة واحدة.
+
+الاسم يُطابق من فهرس taggit الفريد، ثم يُبحث في فهرس (الوسم، الكتاب) مباشرة
+دون ربط بجدول أنواع المحتوى كما في TaggedItem العام.
+"""
+import logging
+from django.db import DataError, IntegrityError
+from django.db.models import Count
+from django.utils.text import slugify
+from taggit.models import Tag
+from .caching import catalogue
+from .models import TaggedBook
+
+logger = logging.getLogger('lms.tags')
+
+CLOUD_CACHE_TIMEOUT = 60 * 10
+
+
+def parse(value):
+    """'a, b,c' -> ['a', 'b', 'c'] بلا تكرار، كما يكتبها المستخدم في الرابط."""
+    return list(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
+
+
+def _items(names):
+    # الاستعلام كسول (استعلام فرعي)، فيصلح أيضاً داخل العروض غير المتزامنة
+    return TaggedBook.objects.filter(tag__name__in=names)
+
+
+def with_any(queryset, names):
+    if not names:
+        return queryset.none()
+    return queryset.filter(id__in=_items(names).values('content_object_id'))
+
+
+def with_all(queryset, names):
+    names = list(dict.fromkeys(names))
+    if not names:
+        return queryset.none()
+    # استعلام فرعي لكل وسم على فهرس (الوسم، الكتاب) الشامل، وتقاطعها هو الكتب التي تحملها كلها
+    for name in names:
+        queryset = queryset.filter(id__in=_items([name]).values('content_object_id'))
+    return queryset
+
+
+def cloud(queryset=None, limit=50):
+    """[(الاسم، عدد الكتب)] مرتبة تنازلياً. بدون queryset تُخزن حسب إصدار الكتالوج."""
+    if queryset is None:
+        return catalogue.get_or_set(f'tag-cloud:{limit}', lambda: _cloud(None, limit), CLOUD_CACHE_TIMEOUT)
+    return _cloud(queryset, limit)
+
+
+def _cloud(queryset, limit):
+    items = TaggedBook.objects.all()
+    if queryset is not None:
+        items = items.filter(content_object_id__in=queryset.values('id'))
+    counts = list(
+        items.values('tag_id').annotate(count=Count('id')).order_by('-count', 'tag_id')[:limit]
+        .values_list('tag_id', 'count')
+    )
+    names = dict(Tag.objects.filter(id__in=[tag_id for tag_id, _count in counts]).values_list('id', 'name'))
+    return [(names[tag_id], count) for tag_id, count in counts]
+
+
+def tags_for(book_ids):
+    """{معرف الكتاب: [أسماء الوسوم]} باستعلام واحد."""
+    tags = {}
+    items = TaggedBook.objects.filter(content_object_id__in=book_ids)
+    for book_id, name in items.values_list('content_object_id', 'tag__name'):
+        tags.setdefault(book_id, []).append(name)
+    return tags
+
+
+def resolve(names):
+    """
+    {الاسم: المعرف} لأسماء وسوم، مع إنشاء الناقص منها بإدخال جماعي واحد.
+
+    الاسم الذي يتصادم slug المشتق منه مع وسم آخر (اختلاف حالة الأحرف، أو اسمان
+    يعطيان slug واحداً) يتجاهله الإدخال الجماعي، فيُنشأ وحده بـ Tag.save() الذي
+    يضيف لاحقة رقمية للـ slug كما في tags.add(). ما تعذر إنشاؤه يُسجّل ويُتخطى.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slugify(name, allow_unicode=True)) for name in names],
+        ignore_conflicts=True,
+    )
+    ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    for name in sorted(names - ids.keys()):
+        try:
+            ids[name] = Tag.objects.get_or_create(name=name)[0].id
+        except (IntegrityError, DataError):
+            logger.warning("تعذر إنشاء الوسم %r، تم تخطيه", name, exc_info=True)
+    return ids
+
+
+def tag_books(book_tags):
+    """{معرف الكتاب: [أسماء]} -> ينشئ الوسوم الناقصة ويربطها بالكتب بإدخالين جماعيين."""
+    ids = resolve(name for names in book_tags.values() for name in names)
+    if not ids:
+        return 0
+    created = TaggedBook.objects.bulk_create(
+        [
+            TaggedBook(content_object_id=book_id, tag_id=ids[name])
+            for book_id, names in book_tags.items()
+            for name in set(names)
+            if name in ids
+        ],
+        batch_size=2000, ignore_conflicts=True,
+    )
+    return len(created)
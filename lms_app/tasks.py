@@ -1,12 +1,37 @@
+import logging
 from celery import shared_task
-from .models import Book
+# تطبيق Celery المهيأ بإعدادات Django يُنشأ مع أول استيراد للمهام لا عند تحميل lms_app،
+# فيكون هو التطبيق الحالي قبل أي delay(). PIL وPDF تُستورد داخل المهمة نفسها.
+from .celery import app as celery_app  # noqa: F401
+
+logger = logging.getLogger('lms.tasks')
+
 
 @shared_task
 def generate_books_pdf_task(book_ids):
-    for book_id in book_ids:
-        try:
-            book = Book.objects.get(id=book_id)
-        
-            print(f"🔧 Generating PDF for book: {book.title}")
-        except Book.DoesNotExist:
-            continue
+    from .pdf import generate_pdfs
+    result = generate_pdfs(book_ids)
+    logger.info("PDF: %d rendered, %d unchanged, %d missing", result['rendered'], result['skipped'], result['missing'])
+    return result
+
+
+@shared_task
+def export_books_task(ranges, fmt, filename):
+    from .exports import export_to_file, iter_rows_for_ranges
+    path = export_to_file(iter_rows_for_ranges(ranges), fmt, filename)
+    logger.info("تم تصدير %d نطاق كتب إلى %s", len(ranges), path)
+    return filename
+
+
+@shared_task
+def generate_image_derivatives_task(names):
+    from .images import generate_many
+    results = generate_many(names)
+    logger.info("تم تجهيز النسخ المصغرة لـ %d صورة", sum(1 for info in results.values() if info))
+
+
+@shared_task
+def drain_book_events_task():
+    """للتشغيل الدوري (celery beat) مع LMS_EVENTS_FLUSH='background'، ولتصريف ما تبقى بعد أي تعطل."""
+    from .events import drain
+    return drain()
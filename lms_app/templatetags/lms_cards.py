@@ -0,0 +1,10 @@
+from django import template
+from lms_app import fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def book_cards(books, layout='books'):
+    """بطاقات الكتب من كاش الأجزاء المرسومة، راجع fragments.render_cards."""
+    return fragments.render_cards(books, layout)
@@ -0,0 +1,31 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from lms_app import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_img(field_file, sizes='120px', **attrs):
+    """
+    صورة بنسخ مصغرة: <picture> بمصدر WebP وبديل JPEG مع srcset.
+
+    إذا لم تُولّد النسخ بعد نعرض الأصل، والتوليد يُجدول عند حفظ الكتاب.
+    """
+    if not field_file:
+        return ''
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    info = images.get_info(field_file.name)
+    if info is None:
+        return format_html('<img src="{}"{}>', field_file.url, extra)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" loading="lazy"{}></picture>',
+        images.srcset_for(info, 'webp'), sizes,
+        images.url_for(info, 320), images.srcset_for(info, 'jpeg'), sizes, extra,
+    )
+
+
+@register.simple_tag
+def thumbnail_url(field_file, width=320):
+    return images.thumbnail_url(field_file, int(width))
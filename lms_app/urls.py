@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path, include
-from . import views
+from . import async_views, views
 from rest_framework.routers import DefaultRouter
 from .views import BookViewSet
 
@@ -12,8 +13,20 @@ urlpatterns = [
     
     path('', views.index, name='index'),
     path('books/', views.books, name='books'),
+    path('books/more/', views.books_more, name='books-more'),
     path('update/<int:id>', views.update, name='update'),
     path('delete/<int:id>', views.delete, name='delete'),
     path('api/', include(router.urls)),
     path('course-autocomplete/', views.course_autocomplete, name='course-autocomplete'),
 ]
+
+if settings.LMS_ASYNC_VIEWS:
+    # عبر ASGI تُخدم عروض القراءة بنسخها غير المتزامنة على نفس الروابط
+    urlpatterns = [
+        path('', async_views.index, name='index'),
+        path('books/', async_views.books, name='books'),
+        path('books/more/', async_views.books_more, name='books-more'),
+        path('api/books/', async_views.api_books, name='book-list'),
+        path('api/books/stats/', async_views.api_book_stats, name='book-stats'),
+        path('course-autocomplete/', async_views.course_autocomplete, name='course-autocomplete'),
+    ] + urlpatterns
@@ -1,12 +1,99 @@
+import hashlib
+from urllib.parse import urlencode
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q, Count
-from lms_app.serializers import BookSerializer
+from django.urls import reverse
+from django.db.models import Q
+from decimal import Decimal
+from django.utils.translation import gettext_lazy as _
+from lms_app.serializers import BookSerializer, requested_fields
 from .models import *
 from .forms import BookForm, CategoryForm
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.template.loader import render_to_string
+from .pagination import CATALOGUE_PAGE_SIZE, BookCursorPagination, keyset_page, parse_cursor
+from . import search, tags
+from .stats import get_book_stats
+from .autocomplete import course_index
+from .caching import catalogue_cached
+from .routers import read_replica, replica_reads
+from contextlib import nullcontext
+
+AUTOCOMPLETE_MAX_AGE = 60
+
+CARD_TEMPLATES = {
+    'index': 'parts/index_book_cards.html',
+    'books': 'parts/book_cards.html',
+}
+
+
+def _catalogue_queryset(query=None, course=None):
+    books = Book.objects.select_related('category', 'course')
+    if course:
+        books = books.filter(course_id=course)
+    if query:
+        books = books.filter(
+            Q(title__icontains=query) |
+            Q(author__icontains=query) |
+            Q(course__name__icontains=query)
+        )
+    return books
+
+
+def _books_page(query, cursor, course=None):
+    if query and search.is_available():
+        # نتائج البحث مرتبة حسب الصلة، والمؤشر هنا إزاحة داخل النتائج
+        offset = cursor or 0
+        ids = search.ranked_ids(query, offset, CATALOGUE_PAGE_SIZE + 1, course=course)
+        found = _catalogue_queryset().in_bulk(ids[:CATALOGUE_PAGE_SIZE])
+        page = [found[book_id] for book_id in ids[:CATALOGUE_PAGE_SIZE] if book_id in found]
+        next_cursor = offset + CATALOGUE_PAGE_SIZE if len(ids) > CATALOGUE_PAGE_SIZE else None
+        return page, next_cursor
+    return keyset_page(_catalogue_queryset(query, course), cursor)
+
+
+def _index_context(categories, page, next_cursor, stats):
+    return {
+        'categories': categories,
+        'books': page,
+        'next_cursor': next_cursor,
+        'next_url': _next_url('index', next_cursor),
+        'form': BookForm(),
+        'formcat': CategoryForm(),
+        'allbooks': stats['active_count'],
+        'allsold': stats['sold_count'],
+        'allrental': stats['rental_count'],
+        'allavailbe': stats['availble_count'],
+    }
+
+
+def _books_context(categories, courses, page, next_cursor, query, course=None):
+    return {
+        'categories': categories,
+        'courses': courses,
+        'books': page,
+        'query': query or '',
+        'selected_course': course,
+        'next_cursor': next_cursor,
+        'next_url': _next_url('books', next_cursor, query, course),
+        'formcat': CategoryForm(),
+    }
+
+
+def _next_url(layout, cursor, query=None, course=None):
+    if cursor is None:
+        return ''
+    params = {'layout': layout, 'cursor': cursor}
+    if query:
+        params['q'] = query
+    if course:
+        params['course'] = course
+    return f"{reverse('books-more')}?{urlencode(params)}"
+
 
 def index(request):
     if request.method == 'POST':
@@ -18,37 +105,35 @@ def index(request):
         if add_category.is_valid():
             add_category.save()
     
-    context = {
-        'categories': Category.objects.all(),
-        'books': Book.objects.all(),
-        'form': BookForm(),
-        'formcat': CategoryForm(),
-        'allbooks': Book.objects.filter(active=True).count(),
-        'allsold': Book.objects.filter(status='sold').count(),
-        'allrental': Book.objects.filter(status='rental').count(),
-        'allavailbe': Book.objects.filter(status='availble').count(),
-    }
-    return render(request, 'pages/index.html', context)
+    # بعد الإضافة نقرأ من الرئيسية حتى يظهر الكتاب الجديد فوراً
+    with replica_reads() if request.method == 'GET' else nullcontext():
+        page, next_cursor = keyset_page(_catalogue_queryset(), parse_cursor(request.GET.get('cursor')))
+        context = _index_context(Category.objects.all(), page, next_cursor, get_book_stats())
+        return render(request, 'pages/index.html', context)
 
+@read_replica
 def books(request):
     query = request.GET.get('q')
-    if query:
-        books = Book.objects.filter(
-            Q(title__icontains=query) |
-            Q(author__icontains=query) |
-            Q(course__name__icontains=query)
-        )
-    else:
-        books = Book.objects.all()
-
-    context = {
-        'categories': Category.objects.all(),
-        'courses': Course.objects.all(),
-        'books': books,
-        'formcat': CategoryForm(),
-    }
+    # فلتر الدورة على الخادم، فيشمل كل الصفحات والدفعات المحمّلة بالتمرير
+    course = parse_cursor(request.GET.get('course'))
+    page, next_cursor = _books_page(query, parse_cursor(request.GET.get('cursor')), course)
+    context = _books_context(Category.objects.all(), Course.objects.all(), page, next_cursor, query, course)
     return render(request, 'pages/books.html', context)
 
+@read_replica
+def books_more(request):
+    # جزء HTML يحتوي الدفعة التالية من البطاقات فقط (للتمرير اللانهائي)
+    layout = request.GET.get('layout')
+    if layout not in CARD_TEMPLATES:
+        layout = 'books'
+    query = request.GET.get('q')
+    course = parse_cursor(request.GET.get('course'))
+    page, next_cursor = _books_page(query, parse_cursor(request.GET.get('cursor')), course)
+    html = render_to_string(CARD_TEMPLATES[layout], {'books': page}, request=request)
+    response = HttpResponse(html)
+    response['X-Next-Url'] = _next_url(layout, next_cursor, query, course)
+    return response
+
 def update(request, id):
     book_id = Book.objects.get(id=id)
     if request.method == 'POST':
@@ -74,19 +159,101 @@ def delete(request, id):
 class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    pagination_class = BookCursorPagination
+
+    def get_queryset(self):
+        queryset = api_books_queryset(super().get_queryset(), requested_fields(self.request))
+        if self.action == 'list':
+            queryset = filter_api_books(queryset, self.request.query_params)
+        return queryset
+
+    @read_replica
+    @catalogue_cached
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @read_replica
+    @catalogue_cached
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'])
+    @read_replica
+    @catalogue_cached
     def stats(self, request):
-        total_books = Book.objects.count()
-        by_category = Book.objects.values('category').annotate(count=Count('id'))
-        return Response({
-            'total_books': total_books,
-            'books_by_category': list(by_category),
-        })
-        
+        return Response(api_stats(get_book_stats()))
+
 
+def api_stats(stats):
+    return {
+        'total_books': stats['total_books'],
+        'books_by_category': stats['books_by_category'],
+    }
+
+
+def api_books_queryset(queryset, fields):
+    if fields is None or 'category_name' in fields:
+        queryset = queryset.select_related('category')
+    if fields is None or 'tags' in fields:
+        queryset = queryset.prefetch_related('tags')
+    if fields is not None:
+        # لا نقرأ من قاعدة البيانات إلا أعمدة الحقول المطلوبة
+        columns = {field.name for field in Book._meta.concrete_fields} & fields
+        if 'category_name' in fields:
+            columns.add('category')
+        queryset = queryset.only('id', *columns)
+    return queryset
+
+
+def _param(params, name, convert):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return convert(value)
+    except (ValueError, ArithmeticError):
+        raise ValidationError({name: _("قيمة غير صالحة.")})
+
+
+def _boolean(value):
+    lowered = value.lower()
+    if lowered in ('true', '1'):
+        return True
+    if lowered in ('false', '0'):
+        return False
+    raise ValueError(value)
+
+
+def filter_api_books(queryset, params):
+    filters = {
+        'status': _param(params, 'status', str),
+        'active': _param(params, 'active', _boolean),
+        'category': _param(params, 'category', int),
+        'course': _param(params, 'course', int),
+        'price__gte': _param(params, 'price_min', Decimal),
+        'price__lte': _param(params, 'price_max', Decimal),
+    }
+    queryset = queryset.filter(**{key: value for key, value in filters.items() if value is not None})
+    # ?tags=a,b للكتب التي تحمل كل الوسوم، و?tags_any=a,b لأيٍّ منها
+    if params.get('tags'):
+        queryset = tags.with_all(queryset, tags.parse(params['tags']))
+    if params.get('tags_any'):
+        queryset = tags.with_any(queryset, tags.parse(params['tags_any']))
+    return queryset
+
+
+@read_replica
 def course_autocomplete(request):
     term = request.GET.get('term', '')
-    courses = Course.objects.filter(name__icontains=term).values_list('name', flat=True)[:10]
-    results = list(courses)
-    return JsonResponse(results, safe=False)
+    return _autocomplete_response(request, term, course_index.current_generation())
+
+
+def _autocomplete_response(request, term, generation):
+    etag = f'"courses-{generation}-{hashlib.md5(term.encode()).hexdigest()}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(course_index.lookup(term), safe=False)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=AUTOCOMPLETE_MAX_AGE)
+    return response